@@ -1,12 +1,21 @@
 from __future__ import annotations
 
 import abc
+import asyncio
+import ipaddress
+import json
+import math
+import multiprocessing
+import os
 import shutil
 import sys
 import tempfile
 import typing
+import uuid
 from dataclasses import asdict
+from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlsplit
 
 # Allow execution as a top-level script (PyInstaller onefile) by fixing imports.
 # We extend sys.path so absolute imports like `backend.*` work consistently.
@@ -24,14 +33,39 @@ if getattr(sys, "frozen", False):
 
     typing._abc_instancecheck = _safe_abc_instancecheck
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel
 
+from backend.em31.calibration import calibrate
+from backend.em31.cleaning import (
+    apply_cleaning,
+    apply_cleaning_to_lines,
+    clean_survey,
+    cleaning_enabled,
+    cleaning_key,
+    validate_cleaning,
+)
+from backend.em31.columns import ColumnarSurvey, iter_reading_table, match_survey, survey_from_parsed
+from backend.em31.crossover import find_crossovers
+from backend.em31.export import EXPORT_FORMATS, arrow_available, iter_export
 from backend.em31.geojson import build_feature_collection
 from backend.em31.parser import parse_em31_file
+from backend.em31.session import SessionStore
+from backend.em31.tail import R31Tail
 from backend.em31.thickness import COEFF_PRESETS
+from backend.em31.timeindex import (
+    TIME_SOURCES,
+    UTC_SOURCES,
+    build_time_index,
+    epoch_ms,
+    iso_local,
+    iso_utc,
+    timeline_table,
+)
+from backend.tile_cache import MISSING_TTL_S, PLACEHOLDER_TILE, CacheStats, TileCache
 
 
 def get_base_dir():
@@ -48,8 +82,26 @@ def get_base_dir():
 BASE_DIR = get_base_dir()
 FRONTEND_DIR = BASE_DIR / "frontend"
 TILES_DIR = BASE_DIR / "tiles"
+TILE_CACHE_MAX_BYTES = int(os.environ.get("TILE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TILE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Missing tiles may be downloaded later, so the placeholder is only cached briefly.
+PLACEHOLDER_CACHE_CONTROL = f"public, max-age={MISSING_TTL_S}"
 
 app = FastAPI(title="EM31 Parser")
+SESSION_DIR = os.environ.get("EM31_SESSION_DIR")
+SESSION_MAX = int(os.environ.get("EM31_MAX_SESSIONS", "16"))
+sessions = SessionStore(Path(SESSION_DIR) if SESSION_DIR else None, max_sessions=SESSION_MAX)
+tile_cache = TileCache(TILES_DIR, max_bytes=TILE_CACHE_MAX_BYTES)
+# Counters are shared by the workers of one run through the session root;
+# a single process keeps them in memory.
+RUN_ID = os.environ.get("EM31_RUN_ID")
+STATS_DIR = sessions.root / ".stats" / RUN_ID if RUN_ID else None
+cache_stats = CacheStats(STATS_DIR, describe=lambda: {"tile_cache": tile_cache.info()})
+
+TAIL_POLL_INTERVAL_S = 0.25
+# Live tail reads server-side files: only under EM31_TAIL_DIR when set,
+# otherwise only for clients on this machine.
+TAIL_DIR = os.environ.get("EM31_TAIL_DIR")
 
 app.add_middleware(
     CORSMiddleware,
@@ -61,9 +113,6 @@ app.add_middleware(
 if FRONTEND_DIR.exists():
     app.mount("/static", StaticFiles(directory=FRONTEND_DIR, html=True), name="static")
 
-if TILES_DIR.exists():
-    app.mount("/tiles", StaticFiles(directory=TILES_DIR), name="tiles")
-
 
 @app.get("/")
 async def root():
@@ -73,6 +122,196 @@ async def root():
     return {"message": "EM31 backend ready"}
 
 
+class DrillPoint(BaseModel):
+    id: typing.Optional[str] = None
+    lat: float
+    lon: float
+    thickness: float
+
+
+class CleaningParams(BaseModel):
+    despike_window: int = 0
+    despike_threshold: float = 3.5
+    mask_saturated: bool = False
+    range_guard: int = 0
+    smooth_window: int = 0
+
+
+class CalibrationRequest(BaseModel):
+    drill_points: typing.List[DrillPoint]
+    inst_height: float = 0.15
+    max_delta_ms: int = 1000
+    max_distance_m: float = 10.0
+    neighbours: int = 5
+    sweep_heights: typing.Optional[typing.List[float]] = None
+    cleaning: typing.Optional[CleaningParams] = None
+
+
+class CrossoverRequest(BaseModel):
+    session_ids: typing.List[str]
+    max_delta_ms: int = 1000
+    inst_height: float = 0.15
+    coeff_profile: str = "winter"
+    coeff_a: typing.Optional[float] = None
+    coeff_b: typing.Optional[float] = None
+    coeff_c: typing.Optional[float] = None
+    max_gap_ms: float = 3000.0
+    cell_size_m: typing.Optional[float] = None
+    include_self: bool = False
+    min_move_m: float = 3.0
+    merge_distance_m: float = 5.0
+    cleaning: typing.Optional[CleaningParams] = None
+
+
+class TimelineRequest(BaseModel):
+    session_ids: typing.List[str]
+    start: typing.Optional[datetime] = None
+    end: typing.Optional[datetime] = None
+    limit: int = 10000
+    max_delta_ms: int = 1000
+
+
+def resolve_coeffs(
+    coeff_profile: typing.Optional[str],
+    coeff_a: typing.Optional[float],
+    coeff_b: typing.Optional[float],
+    coeff_c: typing.Optional[float],
+) -> typing.List[float]:
+    coeff_key = (coeff_profile or "winter").strip().lower()
+    if coeff_key == "custom":
+        if coeff_a is None or coeff_b is None or coeff_c is None:
+            raise HTTPException(status_code=400, detail="Custom coefficients require coeff_a, coeff_b, coeff_c.")
+        if coeff_a <= 0 or coeff_c <= 0:
+            raise HTTPException(status_code=400, detail="Custom coefficients require coeff_a > 0 and coeff_c > 0.")
+        return [coeff_a, coeff_b, coeff_c]
+    coeffs = COEFF_PRESETS.get(coeff_key)
+    if not coeffs:
+        raise HTTPException(status_code=400, detail="Unknown coeff_profile.")
+    return coeffs
+
+
+def resolve_cleaning(
+    despike_window: int = 0,
+    despike_threshold: float = 3.5,
+    mask_saturated: bool = False,
+    range_guard: int = 0,
+    smooth_window: int = 0,
+) -> typing.Dict[str, object]:
+    try:
+        return validate_cleaning(despike_window, despike_threshold, mask_saturated, range_guard, smooth_window)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def cleaning_from_model(params: typing.Optional[CleaningParams]) -> typing.Dict[str, object]:
+    if params is None:
+        return resolve_cleaning()
+    return resolve_cleaning(
+        params.despike_window,
+        params.despike_threshold,
+        params.mask_saturated,
+        params.range_guard,
+        params.smooth_window,
+    )
+
+
+def split_csv_param(value: typing.Optional[str]) -> typing.List[str]:
+    if not value:
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@app.api_route("/tiles/{z}/{x}/{y}.png", methods=["GET", "HEAD"])
+def get_tile(z: int, x: int, y: int, request: Request):
+    tile, hit = tile_cache.lookup(z, x, y)
+    # A remembered missing tile is not a served hit: count it apart from hit_ratio.
+    if hit:
+        cache_stats.record("tiles", "hit" if tile is not None else "missing_hit")
+    else:
+        cache_stats.record("tiles", "miss")
+    cache_control = TILE_CACHE_CONTROL
+    if tile is None:
+        cache_stats.record("tiles", "placeholder")
+        tile = PLACEHOLDER_TILE
+        cache_control = PLACEHOLDER_CACHE_CONTROL
+    headers = {"ETag": tile.etag, "Cache-Control": cache_control}
+    if etag_matches(request, tile.etag):
+        cache_stats.record("tiles", "not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(content=tile.content, media_type="image/png", headers=headers)
+
+
+@app.get("/api/cache-stats")
+async def get_cache_stats():
+    return cache_stats.snapshot()
+
+
+def process_upload(
+    path: Path,
+    max_delta_ms: int,
+    inst_height: float,
+    coeffs: typing.List[float],
+    cleaning: typing.Dict[str, object],
+) -> typing.Dict[str, object]:
+    parsed = parse_em31_file(path)
+    survey = survey_from_parsed(parsed)
+    session_id = sessions.add(survey)
+    feature_lines = parsed["lines"]
+    if cleaning_enabled(cleaning):
+        cleaned = cleaned_columns(session_id, survey, cleaning)
+        feature_lines = apply_cleaning_to_lines(parsed["lines"], cleaned)
+    geojson = build_feature_collection(
+        feature_lines,
+        max_delta_ms=max_delta_ms,
+        inst_height=inst_height,
+        coeffs=coeffs,
+    )
+    header_dict = asdict(parsed["header"])
+    lines_meta = []
+    for line in parsed["lines"]:
+        lines_meta.append(
+            {
+                "line_name": line.line_name,
+                "readings": len(line.readings),
+                "gps_points": len(line.gps_points),
+                "created_at": line.created_at.isoformat() if line.created_at else None,
+            }
+        )
+    return {"session_id": session_id, "header": header_dict, "lines": lines_meta, "geojson": geojson}
+
+
+def load_session(session_id: str) -> ColumnarSurvey:
+    survey = sessions.get(session_id)
+    cache_stats.record("sessions", "hit" if survey is not None else "miss")
+    if survey is None:
+        raise HTTPException(status_code=404, detail="Unknown session, upload the file again.")
+    return survey
+
+
+def matched_pairs(session_id: str, survey: ColumnarSurvey, max_delta_ms: int) -> typing.Dict[str, typing.Any]:
+    return sessions.cached(session_id, f"match_{max_delta_ms}", lambda: match_survey(survey, max_delta_ms))
+
+
+def cleaned_columns(
+    session_id: str, survey: ColumnarSurvey, cleaning: typing.Dict[str, object]
+) -> typing.Dict[str, typing.Any]:
+    return sessions.cached(session_id, cleaning_key(cleaning), lambda: clean_survey(survey, **cleaning))
+
+
+def cleaned_survey(session_id: str, survey: ColumnarSurvey, cleaning: typing.Dict[str, object]) -> ColumnarSurvey:
+    if not cleaning_enabled(cleaning):
+        return survey
+    return apply_cleaning(survey, cleaned_columns(session_id, survey, cleaning))
+
+
 @app.post("/api/upload")
 async def upload_file(
     file: UploadFile = File(...),
@@ -82,52 +321,370 @@ async def upload_file(
     coeff_a: typing.Optional[float] = None,
     coeff_b: typing.Optional[float] = None,
     coeff_c: typing.Optional[float] = None,
+    despike_window: int = 0,
+    despike_threshold: float = 3.5,
+    mask_saturated: bool = False,
+    range_guard: int = 0,
+    smooth_window: int = 0,
 ):
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
     suffix = Path(file.filename).suffix.lower()
     if suffix not in {".r31", ".txt"}:
         raise HTTPException(status_code=400, detail="Expected a .R31 file")
+    coeffs = resolve_coeffs(coeff_profile, coeff_a, coeff_b, coeff_c)
+    cleaning = resolve_cleaning(despike_window, despike_threshold, mask_saturated, range_guard, smooth_window)
     with tempfile.NamedTemporaryFile(delete=False) as tmp:
         shutil.copyfileobj(file.file, tmp)
         tmp_path = Path(tmp.name)
-    coeff_key = (coeff_profile or "winter").strip().lower()
-    if coeff_key == "custom":
-        if coeff_a is None or coeff_b is None or coeff_c is None:
-            raise HTTPException(status_code=400, detail="Custom coefficients require coeff_a, coeff_b, coeff_c.")
-        if coeff_a <= 0 or coeff_c <= 0:
-            raise HTTPException(status_code=400, detail="Custom coefficients require coeff_a > 0 and coeff_c > 0.")
-        coeffs = [coeff_a, coeff_b, coeff_c]
-    else:
-        coeffs = COEFF_PRESETS.get(coeff_key)
-        if not coeffs:
-            raise HTTPException(status_code=400, detail="Unknown coeff_profile.")
+    try:
+        payload = await asyncio.to_thread(process_upload, tmp_path, max_delta_ms, inst_height, coeffs, cleaning)
+        return JSONResponse(payload)
+    finally:
+        try:
+            tmp_path.unlink()
+        except FileNotFoundError:
+            pass
+
 
+@app.post("/api/sessions/{session_id}/export")
+async def export_session(
+    session_id: str,
+    format: str = Form("csv"),
+    columns: typing.Optional[str] = Form(None),
+    lines: typing.Optional[str] = Form(None),
+    exclude: typing.Optional[str] = Form(None),
+    edits: typing.Optional[str] = Form(None),
+    max_delta_ms: int = Form(1000),
+    inst_height: float = Form(0.15),
+    coeff_profile: str = Form("winter"),
+    coeff_a: typing.Optional[float] = Form(None),
+    coeff_b: typing.Optional[float] = Form(None),
+    coeff_c: typing.Optional[float] = Form(None),
+    despike_window: int = Form(0),
+    despike_threshold: float = Form(3.5),
+    mask_saturated: bool = Form(False),
+    range_guard: int = Form(0),
+    smooth_window: int = Form(0),
+):
+    survey = load_session(session_id)
+    fmt = (format or "csv").strip().lower()
+    spec = EXPORT_FORMATS.get(fmt)
+    if spec is None:
+        raise HTTPException(status_code=400, detail="Unknown export format.")
+    if spec["requires_arrow"] and not arrow_available():
+        raise HTTPException(status_code=501, detail="pyarrow is required for Parquet/Feather export.")
+    coeffs = resolve_coeffs(coeff_profile, coeff_a, coeff_b, coeff_c)
+    cleaning = resolve_cleaning(despike_window, despike_threshold, mask_saturated, range_guard, smooth_window)
+    try:
+        cell_edits = json.loads(edits) if edits else None
+    except json.JSONDecodeError as exc:
+        raise HTTPException(status_code=400, detail="edits must be a JSON object.") from exc
+    if cell_edits is not None and not isinstance(cell_edits, dict):
+        raise HTTPException(status_code=400, detail="edits must be a JSON object.")
+    matched = await asyncio.to_thread(matched_pairs, session_id, survey, max_delta_ms)
+    survey = await asyncio.to_thread(cleaned_survey, session_id, survey, cleaning)
     try:
-        parsed = parse_em31_file(tmp_path)
-        geojson = build_feature_collection(
-            parsed["lines"],
+        chunks = iter_reading_table(
+            survey,
             max_delta_ms=max_delta_ms,
             inst_height=inst_height,
             coeffs=coeffs,
+            lines=split_csv_param(lines),
+            exclude=split_csv_param(exclude),
+            columns=split_csv_param(columns),
+            matched=matched,
+            edits=cell_edits,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    stem = Path(survey.header.file_name or "em31_points").stem or "em31_points"
+    filename = f"{stem}.{spec['extension']}"
+    return StreamingResponse(
+        iter_export(chunks, fmt),
+        media_type=spec["media_type"],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def cleaned_rows(
+    session_id: str, survey: ColumnarSurvey, max_delta_ms: int, cleaning: typing.Dict[str, object]
+) -> typing.Dict[str, object]:
+    reading_idx = matched_pairs(session_id, survey, max_delta_ms)["reading"]
+    cleaned = cleaned_columns(session_id, survey, cleaning)
+
+    def as_list(values):
+        return [None if math.isnan(value) else value for value in values[reading_idx].tolist()]
+
+    flags = cleaned["flags"][reading_idx]
+    return {
+        "row_ids": [f"r{n}" for n in range(1, len(reading_idx) + 1)],
+        "conductivity": as_list(cleaned["conductivity"]),
+        "inphase": as_list(cleaned["inphase"]),
+        "flags": flags.tolist(),
+        "flagged": int((flags > 0).sum()),
+    }
+
+
+@app.get("/api/sessions/{session_id}/cleaned")
+async def get_cleaned(
+    session_id: str,
+    max_delta_ms: int = 1000,
+    despike_window: int = 0,
+    despike_threshold: float = 3.5,
+    mask_saturated: bool = False,
+    range_guard: int = 0,
+    smooth_window: int = 0,
+):
+    survey = load_session(session_id)
+    cleaning = resolve_cleaning(despike_window, despike_threshold, mask_saturated, range_guard, smooth_window)
+    payload = await asyncio.to_thread(cleaned_rows, session_id, survey, max_delta_ms, cleaning)
+    return JSONResponse({"cleaning": cleaning, **payload})
+
+
+def session_time_index(session_id: str, survey: ColumnarSurvey) -> typing.Dict[str, typing.Any]:
+    return sessions.cached(session_id, "time_index_utc", lambda: build_time_index(survey))
+
+
+def time_summary(session_id: str, survey: ColumnarSurvey) -> typing.Dict[str, object]:
+    index = session_time_index(session_id, survey)
+    lines = []
+    for idx, line in enumerate(survey.lines):
+        source = TIME_SOURCES[int(index["line_source"][idx])]
+        rms = float(index["line_rms_ms"][idx])
+        # Times that could not be tied to UTC are PC local times.
+        fmt = iso_utc if source in UTC_SOURCES else iso_local
+        lines.append(
+            {
+                "line_name": line.line_name,
+                "source": source,
+                "utc": source in UTC_SOURCES,
+                "segments": int(index["line_segments"][idx]),
+                "rms_ms": None if math.isnan(rms) else rms,
+                "start": fmt(index["line_start_ms"][idx]),
+                "end": fmt(index["line_end_ms"][idx]),
+            }
+        )
+    sorted_utc = index["sorted_utc_ms"]
+    offset = float(index["utc_offset_ms"][0])
+    return {
+        "start": iso_utc(sorted_utc[0]) if len(sorted_utc) else None,
+        "end": iso_utc(sorted_utc[-1]) if len(sorted_utc) else None,
+        "readings": len(sorted_utc),
+        "utc_offset_minutes": None if math.isnan(offset) else offset / 60000.0,
+        "lines": lines,
+    }
+
+
+@app.get("/api/sessions/{session_id}/time")
+async def get_session_time(session_id: str):
+    survey = load_session(session_id)
+    return JSONResponse(await asyncio.to_thread(time_summary, session_id, survey))
+
+
+def timeline_rows(
+    session_ids: typing.List[str],
+    surveys: typing.List[ColumnarSurvey],
+    start_ms: typing.Optional[float],
+    end_ms: typing.Optional[float],
+    limit: int,
+    max_delta_ms: int,
+) -> typing.Dict[str, object]:
+    indexes = [session_time_index(session_id, survey) for session_id, survey in zip(session_ids, surveys)]
+    matched = [matched_pairs(session_id, survey, max_delta_ms) for session_id, survey in zip(session_ids, surveys)]
+    table, total = timeline_table(surveys, indexes, start_ms, end_ms, limit, max_delta_ms, matched)
+    readings = []
+    for record in table.to_dict("records"):
+        file_idx = record.pop("file")
+        record = {key: (None if isinstance(value, float) and math.isnan(value) else value) for key, value in record.items()}
+        readings.append(
+            {
+                "session_id": session_ids[file_idx],
+                "file_name": surveys[file_idx].header.file_name,
+                "utc": iso_utc(record["utc_ms"]),
+                **record,
+            }
         )
-        header_dict = asdict(parsed["header"])
-        lines_meta = []
-        for line in parsed["lines"]:
-            lines_meta.append(
-                {
-                    "line_name": line.line_name,
-                    "readings": len(line.readings),
-                    "gps_points": len(line.gps_points),
-                    "created_at": line.created_at.isoformat() if line.created_at else None,
-                }
-            )
-        return JSONResponse({"header": header_dict, "lines": lines_meta, "geojson": geojson})
+    return {"total": total, "truncated": total > len(readings), "readings": readings}
+
+
+@app.post("/api/timeline")
+async def timeline(request: TimelineRequest):
+    if request.limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be >= 1.")
+    if not request.session_ids:
+        raise HTTPException(status_code=400, detail="session_ids must list at least one session.")
+    session_ids = request.session_ids
+    surveys = [load_session(session_id) for session_id in session_ids]
+    start_ms = epoch_ms(request.start) if request.start else None
+    end_ms = epoch_ms(request.end) if request.end else None
+    if start_ms is not None and end_ms is not None and end_ms < start_ms:
+        raise HTTPException(status_code=400, detail="end must not be before start.")
+    payload = await asyncio.to_thread(
+        timeline_rows, session_ids, surveys, start_ms, end_ms, request.limit, request.max_delta_ms
+    )
+    return JSONResponse(
+        {
+            "start": iso_utc(start_ms) if start_ms is not None else None,
+            "end": iso_utc(end_ms) if end_ms is not None else None,
+            **payload,
+        }
+    )
+
+
+@app.post("/api/sessions/{session_id}/calibrate")
+async def calibrate_session(session_id: str, request: CalibrationRequest):
+    survey = load_session(session_id)
+    if request.neighbours < 1 or request.max_distance_m <= 0:
+        raise HTTPException(status_code=400, detail="neighbours must be >= 1 and max_distance_m > 0.")
+    holes = [
+        {"id": point.id, "lat": point.lat, "lon": point.lon, "thickness": point.thickness}
+        for point in request.drill_points
+    ]
+    cleaning = cleaning_from_model(request.cleaning)
+    try:
+        matched = await asyncio.to_thread(matched_pairs, session_id, survey, request.max_delta_ms)
+        survey = await asyncio.to_thread(cleaned_survey, session_id, survey, cleaning)
+        result = await asyncio.to_thread(
+            calibrate,
+            survey,
+            holes,
+            inst_height=request.inst_height,
+            max_delta_ms=request.max_delta_ms,
+            max_distance_m=request.max_distance_m,
+            neighbours=request.neighbours,
+            sweep_heights=request.sweep_heights,
+            matched=matched,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return JSONResponse(result)
+
+
+@app.post("/api/crossovers")
+async def crossovers(request: CrossoverRequest):
+    if not request.session_ids:
+        raise HTTPException(status_code=400, detail="At least one session_id is required.")
+    if request.cell_size_m is not None and request.cell_size_m <= 0:
+        raise HTTPException(status_code=400, detail="cell_size_m must be > 0.")
+    if request.min_move_m < 0 or request.merge_distance_m < 0:
+        raise HTTPException(status_code=400, detail="min_move_m and merge_distance_m must be >= 0.")
+    coeffs = resolve_coeffs(request.coeff_profile, request.coeff_a, request.coeff_b, request.coeff_c)
+    cleaning = cleaning_from_model(request.cleaning)
+    surveys = [load_session(session_id) for session_id in request.session_ids]
+    matched = [
+        await asyncio.to_thread(matched_pairs, session_id, survey, request.max_delta_ms)
+        for session_id, survey in zip(request.session_ids, surveys)
+    ]
+    surveys = [
+        await asyncio.to_thread(cleaned_survey, session_id, survey, cleaning)
+        for session_id, survey in zip(request.session_ids, surveys)
+    ]
+    result = await asyncio.to_thread(
+        find_crossovers,
+        surveys,
+        max_delta_ms=request.max_delta_ms,
+        inst_height=request.inst_height,
+        coeffs=coeffs,
+        max_gap_ms=request.max_gap_ms,
+        cell_size_m=request.cell_size_m,
+        include_self=request.include_self,
+        matched=matched,
+        min_move_m=request.min_move_m,
+        merge_distance_m=request.merge_distance_m,
+    )
+    for crossing in result["crossovers"]:
+        for side in ("a", "b"):
+            crossing[side]["session_id"] = request.session_ids[crossing[side].pop("file")]
+    return JSONResponse(result)
+
+
+def tail_origin_allowed(websocket: WebSocket) -> bool:
+    """
+    Reject cross-site pages: browsers always send `Origin` on WebSockets,
+    which must then be the viewer's own host. Other clients send none.
+    """
+    origin = websocket.headers.get("origin")
+    if origin is None:
+        return True
+    return urlsplit(origin).netloc == websocket.headers.get("host")
+
+
+def is_loopback(host: typing.Optional[str]) -> bool:
+    try:
+        return ipaddress.ip_address(host or "").is_loopback
+    except ValueError:
+        return host == "localhost"
+
+
+def resolve_tail_path(path: str, client_host: typing.Optional[str]) -> Path:
+    target = Path(path).expanduser().resolve()
+    if TAIL_DIR:
+        root = Path(TAIL_DIR).expanduser().resolve()
+        if not target.is_relative_to(root):
+            raise HTTPException(status_code=403, detail="Path outside EM31_TAIL_DIR.")
+    elif not is_loopback(client_host):
+        raise HTTPException(status_code=403, detail="Live tail is limited to local clients unless EM31_TAIL_DIR is set.")
+    if target.suffix.lower() not in {".r31", ".txt"} or not target.is_file():
+        raise HTTPException(status_code=400, detail="Expected an existing .R31 file")
+    return target
+
+
+def tail_request(message: typing.Dict[str, typing.Any]) -> typing.Optional[str]:
+    """Type of a JSON message sent by the tail client (`{"type": "session"}`)."""
+    try:
+        payload = json.loads(message.get("text") or "null")
+    except json.JSONDecodeError:
+        return None
+    return payload.get("type") if isinstance(payload, dict) else None
+
+
+@app.websocket("/ws/tail")
+async def tail_file(
+    websocket: WebSocket,
+    path: str,
+    max_delta_ms: int = 1000,
+    inst_height: float = 0.15,
+    coeff_profile: str = "winter",
+    coeff_a: typing.Optional[float] = None,
+    coeff_b: typing.Optional[float] = None,
+    coeff_c: typing.Optional[float] = None,
+):
+    if not tail_origin_allowed(websocket):
+        # Closing before accept() refuses the handshake (HTTP 403).
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    try:
+        coeffs = resolve_coeffs(coeff_profile, coeff_a, coeff_b, coeff_c)
+        client_host = websocket.client.host if websocket.client else None
+        target = await asyncio.to_thread(resolve_tail_path, path, client_host)
+    except HTTPException as exc:
+        await websocket.send_json({"type": "error", "detail": exc.detail})
+        await websocket.close(code=1008)
+        return
+    tail = R31Tail(target, max_delta_ms=max_delta_ms, inst_height=inst_height, coeffs=coeffs)
+    # The client only sends session requests; a pending receive() also resolves on disconnect.
+    incoming = asyncio.ensure_future(websocket.receive())
+    try:
+        while True:
+            update = await asyncio.to_thread(tail.poll)
+            if update["features"] or update["tracks"]:
+                await websocket.send_json({"type": "update", **update})
+            await asyncio.wait({incoming}, timeout=TAIL_POLL_INTERVAL_S)
+            if incoming.done():
+                message = incoming.result()
+                if message.get("type") == "websocket.disconnect":
+                    break
+                if tail_request(message) == "session":
+                    # Snapshot for export/calibration; the state matches the updates sent so far.
+                    session_id = await asyncio.to_thread(sessions.add, tail.survey())
+                    await websocket.send_json({"type": "session", "session_id": session_id})
+                incoming = asyncio.ensure_future(websocket.receive())
+    except WebSocketDisconnect:
+        pass
     finally:
-        try:
-            tmp_path.unlink()
-        except FileNotFoundError:
-            pass
+        incoming.cancel()
 
 
 @app.get("/api/health")
@@ -137,12 +694,23 @@ async def health():
 
 def run():
     import uvicorn
-    import os
 
     port = int(os.environ.get("BACKEND_PORT", "8000"))
     host = os.environ.get("BACKEND_HOST", "0.0.0.0")
-    uvicorn.run(app, host=host, port=port, reload=False)
+    workers = max(int(os.environ.get("BACKEND_WORKERS", "1")), 1)
+    if workers == 1:
+        uvicorn.run(app, host=host, port=port, reload=False)
+        return
+    # Worker processes import the app themselves and share parsed sessions
+    # (and cache counters, grouped by run id) through the on-disk SessionStore.
+    run_id = uuid.uuid4().hex
+    os.environ["EM31_RUN_ID"] = run_id
+    try:
+        uvicorn.run("backend.app:app", host=host, port=port, reload=False, workers=workers)
+    finally:
+        shutil.rmtree(sessions.root / ".stats" / run_id, ignore_errors=True)
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     run()
@@ -0,0 +1,119 @@
+"""
+Measure how upload + export throughput scales with the number of backend workers.
+
+Starts `backend/app.py` with BACKEND_WORKERS=N for each N, then hammers it with
+concurrent clients: each iteration uploads a sample file and exports the
+resulting session (which may be served by another worker), e.g.:
+
+    python backend/bench_workers.py --workers 1 2 4 --clients 8 --duration 15
+"""
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+APP_ENTRY = PROJECT_ROOT / "backend" / "app.py"
+DEFAULT_SAMPLE = PROJECT_ROOT / "data-EM31" / "EM31" / "calib1.R31"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(base_url, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Le backend n'a pas démarré à temps.")
+
+
+def client_loop(base_url, payload, filename, deadline):
+    done = 0
+    session = requests.Session()
+    while time.time() < deadline:
+        res = session.post(f"{base_url}/api/upload", files={"file": (filename, payload)})
+        res.raise_for_status()
+        session_id = res.json()["session_id"]
+        export = session.post(f"{base_url}/api/sessions/{session_id}/export", data={"format": "csv"})
+        export.raise_for_status()
+        done += 1
+    return done
+
+
+def bench(workers, clients, duration, sample):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    session_dir = tempfile.mkdtemp(prefix="em31-bench-")
+    env = dict(os.environ)
+    env.update(
+        {
+            "BACKEND_PORT": str(port),
+            "BACKEND_HOST": "127.0.0.1",
+            "BACKEND_WORKERS": str(workers),
+            "EM31_SESSION_DIR": session_dir,
+            # Keep enough sessions alive for every in-flight upload/export pair.
+            "EM31_MAX_SESSIONS": str(max(4 * clients, 16)),
+        }
+    )
+    proc = subprocess.Popen(
+        [sys.executable, str(APP_ENTRY)],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(base_url)
+        payload = sample.read_bytes()
+        # Warm-up so worker start-up is not measured.
+        client_loop(base_url, payload, sample.name, time.time() + 1.0)
+        start = time.time()
+        deadline = start + duration
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            futures = [pool.submit(client_loop, base_url, payload, sample.name, deadline) for _ in range(clients)]
+            total = sum(f.result() for f in futures)
+        elapsed = time.time() - start
+        return total / elapsed
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit upload + export selon le nombre de workers.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--sample", type=Path, default=DEFAULT_SAMPLE)
+    args = parser.parse_args()
+
+    print(f"Fichier: {args.sample.name} · clients: {args.clients} · durée: {args.duration:.0f} s")
+    baseline = None
+    for workers in args.workers:
+        rate = bench(workers, args.clients, args.duration, args.sample)
+        baseline = baseline or rate
+        print(f"workers={workers:<3} {rate:8.2f} req/s   x{rate / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
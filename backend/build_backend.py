@@ -52,6 +52,8 @@ def build():
     ]
     for data in add_data:
         cmd += ["--add-data", data]
+    # Multi-worker mode (BACKEND_WORKERS) re-imports the app by module path.
+    cmd += ["--hidden-import", "backend.app"]
     cmd.append(str(APP_ENTRY))
 
     run(cmd)
@@ -1,19 +1,35 @@
+from .calibration import calibrate
+from .cleaning import clean_survey
+from .columns import ColumnarSurvey, iter_reading_table, survey_from_parsed
+from .crossover import find_crossovers
 from .geojson import build_feature_collection
 from .models import GPSPoint, Header, LineRecord, Reading, TimerRelation
-from .parser import match_readings_to_gps, parse_em31_file
+from .parser import R31StreamParser, match_readings_to_gps, parse_em31_file
+from .tail import R31Tail
 from .thickness import HAAS_2010, thickness
 from .thickness_adapter import compute_thickness
+from .timeindex import build_time_index, timeline_table
 
 __all__ = [
+    "ColumnarSurvey",
     "GPSPoint",
     "HAAS_2010",
     "Header",
     "LineRecord",
+    "R31StreamParser",
+    "R31Tail",
     "Reading",
     "TimerRelation",
     "build_feature_collection",
+    "build_time_index",
+    "calibrate",
+    "clean_survey",
     "compute_thickness",
+    "find_crossovers",
+    "iter_reading_table",
     "match_readings_to_gps",
     "parse_em31_file",
+    "survey_from_parsed",
     "thickness",
+    "timeline_table",
 ]
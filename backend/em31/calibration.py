@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .columns import ColumnarSurvey, match_survey
+from .thickness import COEFF_PRESETS
+
+EARTH_RADIUS_M = 6371000.0
+
+# Default sweep around the published presets (winter, summer, haas2010).
+DEFAULT_A_VALUES = np.linspace(0.5, 1.5, 21)
+DEFAULT_B_VALUES = np.linspace(0.0, 150.0, 31)
+DEFAULT_C_VALUES = np.linspace(800.0, 1600.0, 33)
+# Plausible coefficients: every fit is kept inside the sweep ranges.
+COEFF_BOUNDS = np.array(
+    [
+        [DEFAULT_A_VALUES[0], DEFAULT_A_VALUES[-1]],
+        [DEFAULT_B_VALUES[0], DEFAULT_B_VALUES[-1]],
+        [DEFAULT_C_VALUES[0], DEFAULT_C_VALUES[-1]],
+    ]
+)
+FIT_A_VALUES = np.linspace(COEFF_BOUNDS[0, 0], COEFF_BOUNDS[0, 1], 201)
+# Below this conductivity span (mS/m, about 1 m of thickness with the
+# presets) the holes cannot constrain a, b and c together: only b is fitted.
+MIN_CONDUCTIVITY_SPAN = 200.0
+# Request limits: holes x readings distances and the sweep grow with these.
+MAX_DRILL_HOLES = 200
+MAX_SWEEP_HEIGHTS = 16
+# Largest (A, B, C, holes) block evaluated at once by the sweep (8 MB per temporary).
+SWEEP_CHUNK_ELEMENTS = 1_000_000
+
+
+def local_distances_m(lat0: np.ndarray, lon0: np.ndarray, lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """
+    Equirectangular distances between every origin (rows) and every point
+    (columns); accurate enough at drill-hole scale.
+    """
+    lat0 = np.radians(np.asarray(lat0, dtype=np.float64))[:, None]
+    lon0 = np.radians(np.asarray(lon0, dtype=np.float64))[:, None]
+    lat = np.radians(np.asarray(lat, dtype=np.float64))[None, :]
+    lon = np.radians(np.asarray(lon, dtype=np.float64))[None, :]
+    dx = (lon - lon0) * np.cos(lat0)
+    dy = lat - lat0
+    return EARTH_RADIUS_M * np.hypot(dx, dy)
+
+
+def conductivity_at_holes(
+    survey: ColumnarSurvey,
+    holes_lat: Sequence[float],
+    holes_lon: Sequence[float],
+    max_delta_ms: int = 1000,
+    max_distance_m: float = 10.0,
+    neighbours: int = 5,
+    matched: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Mean apparent conductivity of the `neighbours` georeferenced readings
+    nearest each hole, within `max_distance_m`. Holes without readings get NaN.
+    """
+    if matched is None:
+        matched = match_survey(survey, max_delta_ms=max_delta_ms)
+    cond = survey.readings["conductivity"][matched["reading"]] if len(matched["reading"]) else np.empty(0)
+    lat = survey.gps["lat"][matched["gps"]] if len(matched["gps"]) else np.empty(0)
+    lon = survey.gps["lon"][matched["gps"]] if len(matched["gps"]) else np.empty(0)
+    valid = np.isfinite(cond)
+    cond, lat, lon = cond[valid], lat[valid], lon[valid]
+    n_holes = len(holes_lat)
+    out_cond = np.full(n_holes, np.nan)
+    out_count = np.zeros(n_holes, dtype=np.int64)
+    out_dist = np.full(n_holes, np.nan)
+    if not n_holes or not len(cond):
+        return {"conductivity": out_cond, "count": out_count, "distance_m": out_dist}
+    dist = local_distances_m(holes_lat, holes_lon, lat, lon)
+    k = min(neighbours, dist.shape[1])
+    nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+    near_dist = np.take_along_axis(dist, nearest, axis=1)
+    in_range = near_dist <= max_distance_m
+    out_count = in_range.sum(axis=1)
+    has_any = out_count > 0
+    sums = np.where(in_range, cond[nearest], 0.0).sum(axis=1)
+    out_cond[has_any] = sums[has_any] / out_count[has_any]
+    out_dist[has_any] = np.where(in_range, near_dist, np.inf).min(axis=1)[has_any]
+    return {"conductivity": out_cond, "count": out_count, "distance_m": out_dist}
+
+
+def predict_thickness(
+    appcond: np.ndarray,
+    a: np.ndarray,
+    b: np.ndarray,
+    c: np.ndarray,
+    inst_height: np.ndarray,
+) -> np.ndarray:
+    """
+    Broadcast form of `thickness.thickness`: every argument may carry extra
+    leading axes; invalid retrievals come back as NaN.
+    """
+    mod_app_cond = (appcond - b) / c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ttem = -1.0 / a * np.log(np.where(mod_app_cond > 0, mod_app_cond, np.nan))
+    return ttem - inst_height
+
+
+def sweep_coefficients(
+    appcond: np.ndarray,
+    measured: np.ndarray,
+    a_values: Sequence[float] = DEFAULT_A_VALUES,
+    b_values: Sequence[float] = DEFAULT_B_VALUES,
+    c_values: Sequence[float] = DEFAULT_C_VALUES,
+    inst_heights: Sequence[float] = (0.15,),
+    top: int = 10,
+) -> Dict[str, object]:
+    """
+    Evaluate every (a, b, c, height) combination against the holes and rank
+    them by RMSE. Each height is broadcast over (A, B, C, holes) in blocks of
+    at most `SWEEP_CHUNK_ELEMENTS`, accumulating squared errors, so memory
+    does not grow with the number of heights or holes.
+    Candidates that cannot retrieve a thickness at every hole are discarded.
+    """
+    a = np.asarray(a_values, dtype=np.float64)[:, None, None, None]
+    b = np.asarray(b_values, dtype=np.float64)[None, :, None, None]
+    c = np.asarray(c_values, dtype=np.float64)[None, None, :, None]
+    heights = np.asarray(inst_heights, dtype=np.float64)
+    appcond = np.asarray(appcond, dtype=np.float64)
+    measured = np.asarray(measured, dtype=np.float64)
+    grid = len(a) * b.shape[1] * c.shape[2]
+    step = max(SWEEP_CHUNK_ELEMENTS // max(grid, 1), 1)
+    sse = np.zeros((len(a), b.shape[1], c.shape[2], len(heights)))
+    for ih, height in enumerate(heights):
+        for start in range(0, len(appcond), step):
+            stop = start + step
+            predicted = predict_thickness(appcond[None, None, None, start:stop], a, b, c, height)
+            sse[..., ih] += np.sum((predicted - measured[start:stop]) ** 2, axis=-1)
+    rmse = np.sqrt(sse / max(len(appcond), 1))
+    rmse = np.where(np.isfinite(rmse), rmse, np.inf)
+    flat = rmse.ravel()
+    order = np.argsort(flat, kind="stable")[:top]
+    best = []
+    for flat_idx in order:
+        if not np.isfinite(flat[flat_idx]):
+            break
+        ia, ib, ic, ih = np.unravel_index(flat_idx, rmse.shape)
+        best.append(
+            {
+                "coeffs": [float(a_values[ia]), float(b_values[ib]), float(c_values[ic])],
+                "inst_height": float(inst_heights[ih]),
+                "rmse": float(flat[flat_idx]),
+            }
+        )
+    return {"evaluated": int(flat.size), "best": best}
+
+
+def fit_coefficients(
+    appcond: np.ndarray,
+    measured: np.ndarray,
+    inst_height: float = 0.15,
+    a_values: Sequence[float] = FIT_A_VALUES,
+) -> Optional[Dict[str, object]]:
+    """
+    Least-squares fit of (a, b, c).
+
+    The retrieval model inverts to `appcond = b + c * exp(-a * (thickness + h))`,
+    which is linear in (b, c) once `a` is fixed. The 2x2 normal equations are
+    solved for every candidate `a` at once, then the triple with the lowest
+    thickness RMSE and (b, c) within `COEFF_BOUNDS` is kept.
+    """
+    a = np.asarray(a_values, dtype=np.float64)[:, None]
+    x = np.exp(-a * (measured[None, :] + inst_height))
+    n = appcond.size
+    sx = x.sum(axis=1)
+    sxx = (x * x).sum(axis=1)
+    sy = appcond.sum()
+    sxy = (x * appcond[None, :]).sum(axis=1)
+    det = n * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c = (n * sxy - sx * sy) / det
+        b = (sy - c * sx) / n
+    predicted = predict_thickness(appcond[None, :], a, b[:, None], c[:, None], inst_height)
+    rmse = np.sqrt(np.mean((predicted - measured[None, :]) ** 2, axis=1))
+    inside = (b >= COEFF_BOUNDS[1, 0]) & (b <= COEFF_BOUNDS[1, 1]) & (c >= COEFF_BOUNDS[2, 0]) & (c <= COEFF_BOUNDS[2, 1])
+    rmse = np.where(np.isfinite(rmse) & inside & np.isfinite(det) & (det != 0), rmse, np.inf)
+    best = int(np.argmin(rmse))
+    if not np.isfinite(rmse[best]):
+        return None
+    coeffs = [float(a_values[best]), float(b[best]), float(c[best])]
+    fitted = predicted[best]
+    return {
+        "coeffs": coeffs,
+        "predicted": fitted,
+        "residuals": measured - fitted,
+        "rmse": float(rmse[best]),
+    }
+
+
+def _fit_result(appcond: np.ndarray, measured: np.ndarray, coeffs: Sequence[float], inst_height: float):
+    predicted = predict_thickness(appcond, coeffs[0], coeffs[1], coeffs[2], inst_height)
+    residuals = measured - predicted
+    rmse = float(np.sqrt(np.mean(residuals**2)))
+    return {
+        "coeffs": [float(v) for v in coeffs],
+        "predicted": predicted,
+        "residuals": residuals,
+        "rmse": rmse if np.isfinite(rmse) else float("inf"),
+    }
+
+
+def refine_coefficients(
+    appcond: np.ndarray,
+    measured: np.ndarray,
+    coeffs: Sequence[float],
+    inst_height: float = 0.15,
+    iterations: int = 100,
+    free: Sequence[bool] = (True, True, True),
+) -> Dict[str, object]:
+    """
+    Levenberg-Marquardt polish of a starting triple, minimizing the thickness
+    residuals directly. Only the `free` coefficients move; every step is
+    projected onto `COEFF_BOUNDS` and steps giving invalid retrievals are rejected.
+    """
+    free = np.asarray(free, dtype=bool)
+    params = np.clip(np.asarray(coeffs, dtype=np.float64), COEFF_BOUNDS[:, 0], COEFF_BOUNDS[:, 1])
+    best = _fit_result(appcond, measured, params, inst_height)
+    damping = 1e-3
+    for _ in range(iterations):
+        a, b, c = params
+        total = best["predicted"] + inst_height
+        # d(thickness)/d(a, b, c) for thickness = -ln((appcond - b) / c) / a - h
+        jac = np.column_stack(
+            [
+                -total / a,
+                1.0 / (a * (appcond - b)),
+                np.full(appcond.shape, 1.0 / (a * c)),
+            ]
+        )
+        jac = jac[:, free]
+        jtj = jac.T @ jac
+        jtr = jac.T @ best["residuals"]
+        try:
+            step = np.linalg.solve(jtj + damping * np.diag(np.diag(jtj)), jtr)
+        except np.linalg.LinAlgError:
+            break
+        candidate = params.copy()
+        candidate[free] += step
+        candidate = np.clip(candidate, COEFF_BOUNDS[:, 0], COEFF_BOUNDS[:, 1])
+        trial = None
+        if not np.array_equal(candidate, params):
+            trial = _fit_result(appcond, measured, candidate, inst_height)
+        if trial is not None and trial["rmse"] < best["rmse"]:
+            improvement = best["rmse"] - trial["rmse"]
+            best, params = trial, candidate
+            damping = max(damping / 10.0, 1e-9)
+            if improvement < 1e-12:
+                break
+        else:
+            damping *= 10.0
+            if damping > 1e9:
+                break
+    return best
+
+
+def calibrate(
+    survey: ColumnarSurvey,
+    holes: List[Dict[str, object]],
+    inst_height: float = 0.15,
+    max_delta_ms: int = 1000,
+    max_distance_m: float = 10.0,
+    neighbours: int = 5,
+    sweep_heights: Optional[Sequence[float]] = None,
+    matched: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, object]:
+    """
+    Fit retrieval coefficients against drill holes (`lat`, `lon`, `thickness`,
+    optional `id`): the presets, the closed-form fit and the best swept
+    candidate are each polished by least squares within `COEFF_BOUNDS` and
+    the lowest RMSE wins. When the holes span less than
+    `MIN_CONDUCTIVITY_SPAN`, only b is fitted on top of each preset. Any such
+    limitation is listed in `warnings`. Raises ValueError when fewer than
+    three holes have readings nearby, or beyond `MAX_DRILL_HOLES` holes or
+    `MAX_SWEEP_HEIGHTS` sweep heights.
+    """
+    if len(holes) > MAX_DRILL_HOLES:
+        raise ValueError(f"At most {MAX_DRILL_HOLES} drill holes are accepted.")
+    if sweep_heights and len(sweep_heights) > MAX_SWEEP_HEIGHTS:
+        raise ValueError(f"At most {MAX_SWEEP_HEIGHTS} sweep heights are accepted.")
+    lat = np.asarray([float(h["lat"]) for h in holes], dtype=np.float64)
+    lon = np.asarray([float(h["lon"]) for h in holes], dtype=np.float64)
+    measured = np.asarray([float(h["thickness"]) for h in holes], dtype=np.float64)
+    near = conductivity_at_holes(
+        survey,
+        lat,
+        lon,
+        max_delta_ms=max_delta_ms,
+        max_distance_m=max_distance_m,
+        neighbours=neighbours,
+        matched=matched,
+    )
+    used = np.isfinite(near["conductivity"]) & np.isfinite(measured)
+    if used.sum() < 3:
+        raise ValueError("At least three drill holes with nearby readings are required.")
+    appcond = near["conductivity"][used]
+    heights = sweep_heights if sweep_heights else (inst_height,)
+    sweep = sweep_coefficients(appcond, measured[used], inst_heights=heights)
+    warnings: List[str] = []
+    starts = [list(coeffs) for coeffs in COEFF_PRESETS.values()]
+    span = float(appcond.max() - appcond.min())
+    if span < MIN_CONDUCTIVITY_SPAN:
+        free = (False, True, False)
+        warnings.append(
+            f"Drill holes span only {span:.0f} mS/m of conductivity (< {MIN_CONDUCTIVITY_SPAN:.0f}): "
+            "a and c are kept from the closest preset and only b is fitted."
+        )
+    else:
+        free = (True, True, True)
+        closed_form = fit_coefficients(appcond, measured[used], inst_height=inst_height)
+        if closed_form is not None:
+            starts.append(closed_form["coeffs"])
+        starts += [entry["coeffs"] for entry in sweep["best"] if entry["inst_height"] == inst_height][:1]
+    refined = [
+        refine_coefficients(appcond, measured[used], start, inst_height=inst_height, free=free) for start in starts
+    ]
+    fit = min(refined, key=lambda result: result["rmse"])
+    if not np.isfinite(fit["rmse"]):
+        raise ValueError("No valid coefficients fit these drill holes.")
+    at_bound = [
+        name
+        for name, value, (low, high), is_free in zip("abc", fit["coeffs"], COEFF_BOUNDS, free)
+        if is_free and (np.isclose(value, low) or np.isclose(value, high))
+    ]
+    if at_bound:
+        warnings.append(
+            f"Coefficient(s) {', '.join(at_bound)} reached the edge of the plausible range; "
+            "the drill holes may not be representative."
+        )
+
+    holes_out = []
+    used_pos = np.cumsum(used) - 1
+    for i, hole in enumerate(holes):
+        entry = {
+            "id": hole.get("id"),
+            "lat": float(lat[i]),
+            "lon": float(lon[i]),
+            "measured": float(measured[i]),
+            "conductivity": float(near["conductivity"][i]) if used[i] else None,
+            "readings": int(near["count"][i]),
+            "distance_m": float(near["distance_m"][i]) if used[i] else None,
+            "predicted": None,
+            "residual": None,
+        }
+        if used[i]:
+            predicted = fit["predicted"][used_pos[i]]
+            residual = fit["residuals"][used_pos[i]]
+            entry["predicted"] = float(predicted) if np.isfinite(predicted) else None
+            entry["residual"] = float(residual) if np.isfinite(residual) else None
+        holes_out.append(entry)
+    return {
+        "profile": "custom",
+        "coeffs": fit["coeffs"],
+        "inst_height": inst_height,
+        "rmse": fit["rmse"],
+        "conductivity_span": span,
+        "bounds": {name: [float(low), float(high)] for name, (low, high) in zip("abc", COEFF_BOUNDS)},
+        "warnings": warnings,
+        "holes": holes_out,
+        "sweep": sweep,
+    }
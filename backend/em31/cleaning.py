@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import math
+import warnings
+from dataclasses import replace
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .columns import ColumnarSurvey
+from .models import LineRecord
+
+# Largest magnitude of the 4-digit raw readings: the instrument is saturated.
+SATURATION_RAW = 8191
+# Hampel filter: MAD scaled to a standard deviation for normal noise.
+MAD_TO_STD = 1.4826
+
+FLAG_SPIKE_CONDUCTIVITY = 1
+FLAG_SPIKE_INPHASE = 2
+FLAG_SATURATED_CONDUCTIVITY = 4
+FLAG_SATURATED_INPHASE = 8
+FLAG_RANGE_CHANGE = 16
+
+CLEANED_CHANNELS = (
+    ("conductivity", "raw_reading1", FLAG_SPIKE_CONDUCTIVITY, FLAG_SATURATED_CONDUCTIVITY),
+    ("inphase", "raw_reading2", FLAG_SPIKE_INPHASE, FLAG_SATURATED_INPHASE),
+)
+
+
+def validate_cleaning(
+    despike_window: int = 0,
+    despike_threshold: float = 3.5,
+    mask_saturated: bool = False,
+    range_guard: int = 0,
+    smooth_window: int = 0,
+) -> Dict[str, object]:
+    """
+    Check the cleaning options and return them as keyword arguments for
+    `clean_survey`. Windows are odd sample counts; 0 disables a step.
+    """
+    for name, window in (("despike_window", despike_window), ("smooth_window", smooth_window)):
+        if window < 0 or (window and (window < 3 or window % 2 == 0)):
+            raise ValueError(f"{name} must be 0 or an odd number >= 3.")
+    if not math.isfinite(despike_threshold) or despike_threshold <= 0:
+        raise ValueError("despike_threshold must be a finite number > 0.")
+    if range_guard < 0:
+        raise ValueError("range_guard must be >= 0.")
+    return {
+        "despike_window": int(despike_window),
+        "despike_threshold": float(despike_threshold),
+        "mask_saturated": bool(mask_saturated),
+        "range_guard": int(range_guard),
+        "smooth_window": int(smooth_window),
+    }
+
+
+def cleaning_enabled(options: Dict[str, object]) -> bool:
+    return bool(
+        options["despike_window"] or options["smooth_window"] or options["mask_saturated"] or options["range_guard"]
+    )
+
+
+def cleaning_key(options: Dict[str, object]) -> str:
+    """
+    Session cache key; every option that changes the output is part of it.
+    The threshold uses `repr` so that distinct floats never share a key.
+    """
+    return (
+        f"clean_d{options['despike_window']}_t{options['despike_threshold']!r}"
+        f"_s{int(options['mask_saturated'])}_r{options['range_guard']}_m{options['smooth_window']}"
+    )
+
+
+def _line_order(survey: ColumnarSurvey) -> np.ndarray:
+    r = survey.readings
+    return np.lexsort((r["time_ms"], r["line"]))
+
+
+def rolling(values: np.ndarray, lines: np.ndarray, window: int, reducer: Callable) -> np.ndarray:
+    """
+    Apply `reducer` (a NaN-aware numpy reduction such as `np.nanmedian`) over a
+    centered window of `window` samples, without crossing line boundaries.
+    `values` and `lines` must be sorted by line. Every line is laid out in one
+    padded buffer separated by NaN gaps, so a single strided view covers the
+    whole survey; windows shrink at line ends since NaNs are ignored.
+    """
+    n = len(values)
+    if not n:
+        return np.empty(0, dtype=np.float64)
+    half = window // 2
+    group = np.concatenate(([0], np.cumsum(lines[1:] != lines[:-1])))
+    positions = np.arange(n) + half * (2 * group + 1)
+    padded = np.full(n + 2 * half * (int(group[-1]) + 1), np.nan)
+    padded[positions] = values
+    windows = sliding_window_view(padded, window)[positions - half]
+    with warnings.catch_warnings():
+        # Windows made only of masked samples stay NaN.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return reducer(windows, axis=1)
+
+
+def quantum(values: np.ndarray, raw: np.ndarray) -> np.ndarray:
+    """Physical value of one raw count, i.e. the resolution of each reading."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step = np.abs(values / raw)
+    step[~np.isfinite(step) | (step == 0)] = np.nan
+    fallback = np.nanmedian(step) if np.isfinite(step).any() else np.finfo(np.float64).eps
+    return np.where(np.isnan(step), fallback, step)
+
+
+def despike(
+    values: np.ndarray, lines: np.ndarray, window: int, threshold: float, resolution: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hampel filter: return the mask of samples farther than `threshold` scaled
+    MADs from their rolling median, and that rolling median. The scale never
+    drops below `resolution` so that a one-count step on a flat stretch
+    (MAD = 0) is not taken for a spike.
+    """
+    median = rolling(values, lines, window, np.nanmedian)
+    residual = np.abs(values - median)
+    mad = rolling(residual, lines, window, np.nanmedian)
+    scale = np.maximum(MAD_TO_STD * mad, resolution)
+    with np.errstate(invalid="ignore"):
+        return residual > threshold * scale, median
+
+
+def range_transitions(range_values: np.ndarray, lines: np.ndarray, guard: int) -> np.ndarray:
+    """
+    Mask of the first `guard` readings after each change of measuring range
+    within a line.
+    """
+    n = len(range_values)
+    out = np.zeros(n, dtype=bool)
+    if n < 2 or not guard:
+        return out
+    changes = np.flatnonzero((range_values[1:] != range_values[:-1]) & (lines[1:] == lines[:-1])) + 1
+    if not len(changes):
+        return out
+    # Readings within `guard` samples of the last change, on the same line.
+    idx = np.arange(n)
+    last = np.searchsorted(changes, idx, side="right") - 1
+    anchor = changes[np.maximum(last, 0)]
+    out = (last >= 0) & (idx - anchor < guard) & (lines == lines[anchor])
+    return out
+
+
+def clean_survey(
+    survey: ColumnarSurvey,
+    despike_window: int = 0,
+    despike_threshold: float = 3.5,
+    mask_saturated: bool = False,
+    range_guard: int = 0,
+    smooth_window: int = 0,
+) -> Dict[str, np.ndarray]:
+    """
+    Cleaned `conductivity` / `inphase` columns and a `flags` bitmask, in the
+    survey's reading order. Steps run per line in time order: saturation
+    masking (NaN), Hampel despiking (spikes replaced by the rolling median)
+    and moving-average smoothing; range changes are only flagged.
+    """
+    r = survey.readings
+    n = len(r.get("time_ms", ()))
+    if not n:
+        return {"conductivity": np.empty(0), "inphase": np.empty(0), "flags": np.empty(0, dtype=np.uint8)}
+    order = _line_order(survey)
+    lines = r["line"][order]
+    flags = np.zeros(n, dtype=np.uint8)
+    out: Dict[str, np.ndarray] = {}
+    for name, raw_name, spike_flag, saturated_flag in CLEANED_CHANNELS:
+        values = np.array(r[name][order], dtype=np.float64)
+        if mask_saturated:
+            saturated = np.abs(r[raw_name][order]) >= SATURATION_RAW
+            values[saturated] = np.nan
+            flags[order[saturated]] |= saturated_flag
+        if despike_window:
+            resolution = quantum(np.asarray(r[name][order], dtype=np.float64), r[raw_name][order])
+            spikes, median = despike(values, lines, despike_window, despike_threshold, resolution)
+            values[spikes] = median[spikes]
+            flags[order[spikes]] |= spike_flag
+        if smooth_window:
+            finite = np.isfinite(values)
+            values[finite] = rolling(values, lines, smooth_window, np.nanmean)[finite]
+        column = np.empty(n, dtype=np.float64)
+        column[order] = values
+        out[name] = column
+    if range_guard:
+        transitions = range_transitions(r["range_value"][order], lines, range_guard)
+        flags[order[transitions]] |= FLAG_RANGE_CHANGE
+    out["flags"] = flags
+    return out
+
+
+def apply_cleaning(survey: ColumnarSurvey, cleaned: Dict[str, np.ndarray]) -> ColumnarSurvey:
+    """Survey view whose reading columns are replaced by the cleaned ones."""
+    readings = dict(survey.readings)
+    readings.update(cleaned)
+    return replace(survey, readings=readings)
+
+
+def apply_cleaning_to_lines(lines: List[LineRecord], cleaned: Dict[str, np.ndarray]) -> List[LineRecord]:
+    """
+    Copy of parsed `lines` carrying the cleaned values, for the object-based
+    GeoJSON builder; columns follow the `survey_from_parsed` reading order.
+    """
+    conductivity = cleaned["conductivity"].tolist()
+    inphase = cleaned["inphase"].tolist()
+    out: List[LineRecord] = []
+    pos = 0
+    for line in lines:
+        readings = []
+        for reading in line.readings:
+            cond, inph = conductivity[pos], inphase[pos]
+            readings.append(
+                replace(
+                    reading,
+                    conductivity=None if math.isnan(cond) else cond,
+                    inphase=None if math.isnan(inph) else inph,
+                )
+            )
+            pos += 1
+        out.append(replace(line, readings=readings))
+    return out
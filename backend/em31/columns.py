@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .models import Header, LineRecord
+from .thickness import HAAS_2010, thickness
+
+READING_FIELDS = (
+    "time_ms",
+    "info_byte",
+    "marker",
+    "dipole_mode",
+    "range_value",
+    "raw_reading1",
+    "raw_reading2",
+    "conductivity",
+    "inphase",
+    "station",
+)
+GPS_FIELDS = ("time_ms", "lat", "lon", "hdop", "quality", "satellites", "altitude", "utc_seconds")
+
+# Columns of the matched reading table, named like the GeoJSON feature properties.
+TABLE_COLUMNS = (
+    "row_id",
+    "line_name",
+    "time_ms",
+    "lat",
+    "lon",
+    "conductivity",
+    "thickness",
+    "inphase",
+    "range",
+    "dipole_mode",
+    "marker",
+    "station",
+    "raw_reading1",
+    "raw_reading2",
+    "gps_quality",
+    "gps_satellites",
+    "gps_hdop",
+    "gps_altitude",
+    "flags",
+)
+DEFAULT_EXPORT_COLUMNS = ("time_ms", "lat", "lon", "conductivity", "thickness", "inphase")
+
+_NULLABLE_INT_COLUMNS = ("range", "raw_reading1", "raw_reading2", "gps_quality", "gps_satellites")
+
+# Columns the viewer table lets the user edit, with the type of their values.
+# Thickness edits come as `base_thickness` (thickness + instrument height),
+# so that they follow `inst_height` like in the viewer.
+EDITABLE_COLUMNS = {
+    "conductivity": float,
+    "base_thickness": float,
+    "inphase": float,
+    "range": int,
+    "dipole_mode": str,
+    "gps_satellites": int,
+    "gps_hdop": float,
+}
+
+
+@dataclass
+class ColumnarSurvey:
+    """
+    Parsed survey stored as flat column arrays.
+    `lines` only keeps line metadata; readings and GPS points live in the
+    `readings` / `gps` arrays and are tied to their line by the `line` column.
+    """
+
+    header: Header
+    lines: List[LineRecord] = field(default_factory=list)
+    readings: Dict[str, np.ndarray] = field(default_factory=dict)
+    gps: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def line_names(self) -> List[Optional[str]]:
+        return [line.line_name for line in self.lines]
+
+
+def _float_or_nan(value: Optional[float]) -> float:
+    return np.nan if value is None else float(value)
+
+
+def survey_from_parsed(parsed: Dict[str, object]) -> ColumnarSurvey:
+    lines: List[LineRecord] = parsed["lines"]
+    r_line: List[int] = []
+    r_cols: Dict[str, list] = {name: [] for name in READING_FIELDS}
+    g_line: List[int] = []
+    g_cols: Dict[str, list] = {name: [] for name in GPS_FIELDS}
+    for idx, line in enumerate(lines):
+        for reading in line.readings:
+            r_line.append(idx)
+            for name in READING_FIELDS:
+                r_cols[name].append(getattr(reading, name))
+        for point in line.gps_points:
+            g_line.append(idx)
+            for name in GPS_FIELDS:
+                g_cols[name].append(getattr(point, name))
+    readings = {
+        "line": np.asarray(r_line, dtype=np.int32),
+        "time_ms": np.asarray(r_cols["time_ms"], dtype=np.int64),
+        "info_byte": np.asarray(r_cols["info_byte"], dtype=np.int16),
+        "marker": np.asarray(r_cols["marker"], dtype=bool),
+        "dipole_mode": np.asarray(r_cols["dipole_mode"], dtype="<U10"),
+        "range_value": np.asarray(r_cols["range_value"], dtype=np.int32),
+    }
+    for name in ("raw_reading1", "raw_reading2", "conductivity", "inphase", "station"):
+        readings[name] = np.asarray([_float_or_nan(v) for v in r_cols[name]], dtype=np.float64)
+    gps = {
+        "line": np.asarray(g_line, dtype=np.int32),
+        "time_ms": np.asarray(g_cols["time_ms"], dtype=np.int64),
+    }
+    for name in ("lat", "lon", "hdop", "quality", "satellites", "altitude", "utc_seconds"):
+        gps[name] = np.asarray([_float_or_nan(v) for v in g_cols[name]], dtype=np.float64)
+    meta_lines = [replace(line, readings=[], gps_points=[]) for line in lines]
+    return ColumnarSurvey(header=parsed["header"], lines=meta_lines, readings=readings, gps=gps)
+
+
+def nearest_gps_index(reading_times: np.ndarray, gps_times: np.ndarray, max_delta_ms: int) -> np.ndarray:
+    """
+    Vectorized equivalent of `parser.match_readings_to_gps` for sorted inputs:
+    returns, per reading, the index of the nearest GPS fix (ties go to the later
+    fix) or -1 when it is farther than `max_delta_ms`.
+    """
+    n_gps = len(gps_times)
+    out = np.full(len(reading_times), -1, dtype=np.int64)
+    if n_gps == 0 or len(reading_times) == 0:
+        return out
+    right = np.searchsorted(gps_times, reading_times, side="left")
+    has_right = right < n_gps
+    right_c = np.minimum(right, n_gps - 1)
+    # Among duplicated timestamps, the greedy matcher settles on the last one.
+    right_c = np.searchsorted(gps_times, gps_times[right_c], side="right") - 1
+    left = right - 1
+    has_left = left >= 0
+    left_c = np.maximum(left, 0)
+    d_right = np.where(has_right, np.abs(gps_times[right_c] - reading_times), np.iinfo(np.int64).max)
+    d_left = np.where(has_left, np.abs(reading_times - gps_times[left_c]), np.iinfo(np.int64).max)
+    pick = np.where(d_right <= d_left, right_c, left_c)
+    best = np.minimum(d_right, d_left)
+    out[best <= max_delta_ms] = pick[best <= max_delta_ms]
+    return out
+
+
+def match_survey(survey: ColumnarSurvey, max_delta_ms: int = 1000) -> Dict[str, np.ndarray]:
+    """
+    Pair every reading with its GPS fix, line by line, in the same order as
+    `build_feature_collection` emits reading features.
+    Returns the reading and GPS indices of the matched pairs.
+    """
+    r_line = survey.readings.get("line", np.empty(0, dtype=np.int32))
+    g_line = survey.gps.get("line", np.empty(0, dtype=np.int32))
+    reading_parts: List[np.ndarray] = []
+    gps_parts: List[np.ndarray] = []
+    for idx in range(len(survey.lines)):
+        r_idx = np.flatnonzero(r_line == idx)
+        g_idx = np.flatnonzero(g_line == idx)
+        if not len(r_idx) or not len(g_idx):
+            continue
+        r_idx = r_idx[np.argsort(survey.readings["time_ms"][r_idx], kind="stable")]
+        g_idx = g_idx[np.argsort(survey.gps["time_ms"][g_idx], kind="stable")]
+        nearest = nearest_gps_index(survey.readings["time_ms"][r_idx], survey.gps["time_ms"][g_idx], max_delta_ms)
+        keep = nearest >= 0
+        reading_parts.append(r_idx[keep])
+        gps_parts.append(g_idx[nearest[keep]])
+    if not reading_parts:
+        empty = np.empty(0, dtype=np.int64)
+        return {"reading": empty, "gps": empty}
+    return {"reading": np.concatenate(reading_parts), "gps": np.concatenate(gps_parts)}
+
+
+def reading_table(
+    survey: ColumnarSurvey,
+    reading_idx: np.ndarray,
+    gps_idx: np.ndarray,
+    row_ids: np.ndarray,
+    inst_height: float = 0.15,
+    coeffs: Optional[List[float]] = None,
+    edits: Optional[Dict[int, Dict[str, object]]] = None,
+) -> pd.DataFrame:
+    """
+    Materialize matched rows as a DataFrame with `TABLE_COLUMNS`.
+    `row_ids` are the 1-based positions that the frontend displays as `r<N>`.
+    `edits` (from `parse_edits`) are applied before the thickness is derived
+    from conductivity; an edited base thickness then overrides it.
+    """
+    r = survey.readings
+    g = survey.gps
+    names = np.asarray([name or "" for name in survey.line_names] or [""], dtype=object)
+    df = pd.DataFrame(
+        {
+            "row_id": np.char.add("r", np.asarray(row_ids).astype(str)) if len(row_ids) else np.empty(0, dtype=str),
+            "line_name": names[r["line"][reading_idx]],
+            "time_ms": r["time_ms"][reading_idx],
+            "lat": g["lat"][gps_idx],
+            "lon": g["lon"][gps_idx],
+            "conductivity": r["conductivity"][reading_idx],
+            "inphase": r["inphase"][reading_idx],
+            "range": r["range_value"][reading_idx],
+            "dipole_mode": r["dipole_mode"][reading_idx],
+            "marker": r["marker"][reading_idx],
+            "station": r["station"][reading_idx],
+            "raw_reading1": r["raw_reading1"][reading_idx],
+            "raw_reading2": r["raw_reading2"][reading_idx],
+            "gps_quality": g["quality"][gps_idx],
+            "gps_satellites": g["satellites"][gps_idx],
+            "gps_hdop": g["hdop"][gps_idx],
+            "gps_altitude": g["altitude"][gps_idx],
+            # Bitmask set by the optional cleaning stage (see cleaning.py).
+            "flags": r["flags"][reading_idx] if "flags" in r else np.zeros(len(reading_idx), dtype=np.uint8),
+        }
+    )
+    for name in _NULLABLE_INT_COLUMNS:
+        df[name] = df[name].astype("Int64")
+    edited = _edited_rows(row_ids, edits) if edits else {}
+    for pos, fields in edited.items():
+        for name, value in fields.items():
+            if name != "base_thickness":
+                df.at[pos, name] = value
+    ttem = thickness(
+        pd.DataFrame({"appcond": df["conductivity"]}),
+        inst_height=inst_height,
+        coeffs=coeffs if coeffs is not None else HAAS_2010,
+    )["ttem"]
+    df["thickness"] = ttem.to_numpy()
+    for pos, fields in edited.items():
+        if "base_thickness" in fields:
+            df.at[pos, "thickness"] = fields["base_thickness"] - inst_height
+    return df[list(TABLE_COLUMNS)]
+
+
+def parse_edits(edits: Dict[str, Dict[str, object]]) -> Dict[int, Dict[str, object]]:
+    """
+    Validate the viewer's cell edits, `{"r<N>": {column: value}}`, and key them
+    by row number. Values are coerced to the column type; None clears a cell.
+    """
+    out: Dict[int, Dict[str, object]] = {}
+    for row_id, fields in edits.items():
+        number = str(row_id).lstrip("r")
+        if not number.isdigit() or not isinstance(fields, dict):
+            raise ValueError(f"Invalid edit for row {row_id!r}.")
+        row: Dict[str, object] = {}
+        for name, value in fields.items():
+            kind = EDITABLE_COLUMNS.get(name)
+            if kind is None:
+                raise ValueError(f"Column {name!r} cannot be edited.")
+            if value is None:
+                row[name] = pd.NA if kind is int else (np.nan if kind is float else None)
+                continue
+            try:
+                if kind is str:
+                    row[name] = str(value)
+                elif kind is int:
+                    row[name] = _as_int(value)
+                else:
+                    row[name] = float(value)
+            except (TypeError, ValueError) as exc:
+                raise ValueError(f"Invalid value for {name} on row {row_id}.") from exc
+        out[int(number)] = row
+    return out
+
+
+def _as_int(value: object) -> int:
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f"{value!r} is not an integer.")
+    return int(number)
+
+
+def _edited_rows(row_ids: np.ndarray, edits: Dict[int, Dict[str, object]]) -> Dict[int, Dict[str, object]]:
+    """Edits of the rows present in `row_ids`, keyed by their position."""
+    edited = np.flatnonzero(np.isin(row_ids, np.fromiter(edits, dtype=np.int64, count=len(edits))))
+    return {int(pos): edits[int(row_ids[pos])] for pos in edited}
+
+
+def iter_reading_table(
+    survey: ColumnarSurvey,
+    max_delta_ms: int = 1000,
+    inst_height: float = 0.15,
+    coeffs: Optional[List[float]] = None,
+    lines: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 5000,
+    matched: Optional[Dict[str, np.ndarray]] = None,
+    edits: Optional[Dict[str, Dict[str, object]]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Return an iterator over the matched reading table in chunks of at most
+    `chunk_size` rows, after line filtering and removal of the excluded row ids.
+    Row ids are assigned before filtering so they stay aligned with the viewer.
+    Column names and `edits` (see `parse_edits`) are validated eagerly so
+    callers can fail before streaming.
+    `matched` may carry a cached `match_survey` result.
+    """
+    selected = list(columns) if columns else list(DEFAULT_EXPORT_COLUMNS)
+    unknown = [name for name in selected if name not in TABLE_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    row_edits = parse_edits(edits) if edits else {}
+    if matched is None:
+        matched = match_survey(survey, max_delta_ms=max_delta_ms)
+    reading_idx = matched["reading"]
+    gps_idx = matched["gps"]
+    row_ids = np.arange(1, len(reading_idx) + 1)
+    keep = np.ones(len(reading_idx), dtype=bool)
+    if lines:
+        wanted_names = set(lines)
+        wanted = [i for i, name in enumerate(survey.line_names) if name in wanted_names]
+        keep &= np.isin(survey.readings["line"][reading_idx], wanted)
+    if exclude:
+        excluded = [int(v.lstrip("r")) for v in exclude if v.lstrip("r").isdigit()]
+        keep &= ~np.isin(row_ids, excluded)
+    reading_idx, gps_idx, row_ids = reading_idx[keep], gps_idx[keep], row_ids[keep]
+
+    def chunks() -> Iterator[pd.DataFrame]:
+        # An empty selection still yields one empty chunk so exports keep their header.
+        for start in range(0, max(len(reading_idx), 1), chunk_size):
+            stop = start + chunk_size
+            chunk = reading_table(
+                survey,
+                reading_idx[start:stop],
+                gps_idx[start:stop],
+                row_ids[start:stop],
+                inst_height=inst_height,
+                coeffs=coeffs,
+                edits=row_edits,
+            )
+            yield chunk[selected]
+
+    return chunks()
@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .calibration import EARTH_RADIUS_M, predict_thickness
+from .columns import ColumnarSurvey, match_survey
+from .thickness import HAAS_2010
+
+CROSSOVER_VALUES = ("conductivity", "inphase", "thickness")
+
+
+def _tracks(surveys: Sequence[ColumnarSurvey]) -> List[Dict[str, object]]:
+    """
+    Per-line GPS polylines, time-sorted like the `track` features of
+    `build_feature_collection`.
+    """
+    tracks = []
+    for file_idx, survey in enumerate(surveys):
+        g_line = survey.gps.get("line", np.empty(0, dtype=np.int32))
+        for line_idx, name in enumerate(survey.line_names):
+            idx = np.flatnonzero(g_line == line_idx)
+            if len(idx) < 2:
+                continue
+            idx = idx[np.argsort(survey.gps["time_ms"][idx], kind="stable")]
+            tracks.append(
+                {
+                    "file": file_idx,
+                    "line": line_idx,
+                    "line_name": name,
+                    "lat": np.asarray(survey.gps["lat"][idx], dtype=np.float64),
+                    "lon": np.asarray(survey.gps["lon"][idx], dtype=np.float64),
+                    "time_ms": np.asarray(survey.gps["time_ms"][idx], dtype=np.int64),
+                }
+            )
+    return tracks
+
+
+# A fix is stationary when the mean positions over the STATIONARY_WINDOW_MS
+# before and after it are less than `min_move_m` apart (means damp GPS jitter).
+STATIONARY_WINDOW_MS = 5000
+
+
+def _collapse_stationary(
+    x: np.ndarray, y: np.ndarray, t: np.ndarray, min_move_m: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Replace each run of stationary fixes by its mean position and time, so
+    GPS jitter while the operator stands still (drilling, pauses) does not
+    cross the other lines again and again. The track stays connected.
+    """
+    if not min_move_m or len(x) < 2:
+        return x, y, t
+    idx = np.arange(len(x))
+    lo = np.searchsorted(t, t - STATIONARY_WINDOW_MS, side="left")
+    hi = np.searchsorted(t, t + STATIONARY_WINDOW_MS, side="right") - 1
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    before_n, after_n = idx - lo + 1, hi - idx + 1
+    dx = (cx[hi + 1] - cx[idx]) / after_n - (cx[idx + 1] - cx[lo]) / before_n
+    dy = (cy[hi + 1] - cy[idx]) / after_n - (cy[idx + 1] - cy[lo]) / before_n
+    still = np.hypot(dx, dy) < min_move_m
+    if not still.any():
+        return x, y, t
+    starts = np.flatnonzero(~still | ~np.concatenate(([False], still[:-1])))
+    counts = np.diff(np.append(starts, len(x)))
+    return (
+        np.add.reduceat(x, starts) / counts,
+        np.add.reduceat(y, starts) / counts,
+        np.add.reduceat(t, starts) / counts,
+    )
+
+
+def _merge_close(along: np.ndarray, pair_key: np.ndarray, merge_distance_m: float) -> np.ndarray:
+    """
+    Indices of the hits to keep once crossings of the same pair of tracks
+    lying within `merge_distance_m` of each other along one track are merged
+    (the middle crossing of each cluster stands for it).
+    """
+    if not len(along) or not merge_distance_m:
+        return np.arange(len(along))
+    order = np.lexsort((along, pair_key))
+    key, dist = pair_key[order], along[order]
+    new_cluster = np.ones(len(order), dtype=bool)
+    new_cluster[1:] = (key[1:] != key[:-1]) | (np.diff(dist) > merge_distance_m)
+    starts = np.flatnonzero(new_cluster)
+    counts = np.diff(np.append(starts, len(order)))
+    return np.sort(order[starts + counts // 2])
+
+
+# Segments spanning more cells than this (GPS jumps, transits) skip the grid
+# and are tested against every segment instead.
+MAX_CELLS_PER_SEGMENT = 64
+
+
+def _grid_entries(
+    x0: np.ndarray, y0: np.ndarray, x1: np.ndarray, y1: np.ndarray, cell_size: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Register each segment in every grid cell its bounding box touches.
+    Returns (segment, cell id) entries sorted by cell, plus the indices of
+    the long segments left out of the grid.
+    """
+    cx0 = np.floor(np.minimum(x0, x1) / cell_size).astype(np.int64)
+    cx1 = np.floor(np.maximum(x0, x1) / cell_size).astype(np.int64)
+    cy0 = np.floor(np.minimum(y0, y1) / cell_size).astype(np.int64)
+    cy1 = np.floor(np.maximum(y0, y1) / cell_size).astype(np.int64)
+    nx = cx1 - cx0 + 1
+    ny = cy1 - cy0 + 1
+    per_seg = nx * ny
+    long_segments = np.flatnonzero(per_seg > MAX_CELLS_PER_SEGMENT)
+    per_seg[long_segments] = 0
+    seg = np.repeat(np.arange(len(x0)), per_seg)
+    # Position of each entry inside its segment's block of cells.
+    offset = np.arange(per_seg.sum()) - np.repeat(np.cumsum(per_seg) - per_seg, per_seg)
+    cell_x = cx0[seg] + offset % nx[seg]
+    cell_y = cy0[seg] + offset // nx[seg]
+    order = np.lexsort((seg, cell_y, cell_x))
+    cell_x, cell_y = cell_x[order], cell_y[order]
+    cell = np.zeros(len(order), dtype=np.int64)
+    if len(order):
+        cell[1:] = np.cumsum((cell_x[1:] != cell_x[:-1]) | (cell_y[1:] != cell_y[:-1]))
+    return seg[order], cell, long_segments
+
+
+def _iter_candidate_pairs(
+    seg: np.ndarray,
+    cell: np.ndarray,
+    long_segments: np.ndarray,
+    candidates: np.ndarray,
+    group: np.ndarray,
+) -> Iterator[np.ndarray]:
+    """
+    Spatial-grid broad phase: yield (i, j) segment pairs sharing a cell, one
+    batch per offset inside the cell so memory stays bounded by the batch.
+    Long segments are paired with every candidate segment.
+    Pairs within the same `group` (same track) are skipped.
+    """
+    for long_seg in long_segments:
+        other = candidates[group[candidates] != group[long_seg]]
+        if len(other):
+            yield np.column_stack([np.full(len(other), long_seg), other])
+    shift = 1
+    while shift < len(seg):
+        same = cell[shift:] == cell[:-shift]
+        if not same.any():
+            break
+        a = seg[:-shift][same]
+        b = seg[shift:][same]
+        keep = group[a] != group[b]
+        if keep.any():
+            yield np.column_stack([a[keep], b[keep]])
+        shift += 1
+
+
+def _intersections(
+    pairs: np.ndarray, x0: np.ndarray, y0: np.ndarray, x1: np.ndarray, y1: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Narrow phase: exact segment intersection, half-open so a crossing on a
+    shared vertex is only reported once. Returns the hit pairs and the
+    fractions along each segment.
+    """
+    a, b = pairs[:, 0], pairs[:, 1]
+    rx, ry = x1[a] - x0[a], y1[a] - y0[a]
+    sx, sy = x1[b] - x0[b], y1[b] - y0[b]
+    qx, qy = x0[b] - x0[a], y0[b] - y0[a]
+    denom = rx * sy - ry * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (qx * sy - qy * sx) / denom
+        u = (qx * ry - qy * rx) / denom
+    hit = (denom != 0) & (t >= 0) & (t < 1) & (u >= 0) & (u < 1)
+    return pairs[hit], t[hit], u[hit]
+
+
+def _interp_at(times: np.ndarray, values: np.ndarray, at: np.ndarray, max_gap_ms: float) -> np.ndarray:
+    valid = np.isfinite(values)
+    times, values = times[valid], values[valid]
+    out = np.full(len(at), np.nan)
+    if not len(times):
+        return out
+    order = np.argsort(times, kind="stable")
+    times, values = times[order], values[order]
+    right = np.clip(np.searchsorted(times, at), 0, len(times) - 1)
+    left = np.clip(right - 1, 0, len(times) - 1)
+    gap = np.minimum(np.abs(times[right] - at), np.abs(at - times[left]))
+    ok = (gap <= max_gap_ms) & (at >= times[0] - max_gap_ms) & (at <= times[-1] + max_gap_ms)
+    out[ok] = np.interp(at[ok], times, values)
+    return out
+
+
+def _summary(diff: np.ndarray) -> Dict[str, Optional[float]]:
+    valid = diff[np.isfinite(diff)]
+    if not len(valid):
+        return {"count": 0, "mean": None, "median": None, "std": None, "rms": None, "mean_abs": None}
+    return {
+        "count": int(len(valid)),
+        "mean": float(valid.mean()),
+        "median": float(np.median(valid)),
+        "std": float(valid.std()),
+        "rms": float(np.sqrt(np.mean(valid**2))),
+        "mean_abs": float(np.mean(np.abs(valid))),
+    }
+
+
+def find_crossovers(
+    surveys: Sequence[ColumnarSurvey],
+    max_delta_ms: int = 1000,
+    inst_height: float = 0.15,
+    coeffs: Optional[List[float]] = None,
+    max_gap_ms: float = 3000.0,
+    cell_size_m: Optional[float] = None,
+    include_self: bool = False,
+    matched: Optional[Sequence[Dict[str, np.ndarray]]] = None,
+    min_move_m: float = 3.0,
+    merge_distance_m: float = 5.0,
+) -> Dict[str, object]:
+    """
+    Find every intersection between line tracks of one or several surveys
+    and compare the values of both lines at the crossing (A - B).
+
+    Candidate segment pairs come from a uniform spatial grid, so the cost
+    grows with the number of nearby segments rather than O(n^2). Values are
+    interpolated in time along each line from its georeferenced readings;
+    a side farther than `max_gap_ms` from any reading is left empty.
+    Stationary stretches are collapsed to one vertex (`min_move_m`) and
+    crossings of the same two tracks closer than `merge_distance_m` are
+    reported once, so standing still at a crossing does not weigh on the
+    statistics. 0 disables either step.
+    """
+    coeffs = coeffs if coeffs is not None else HAAS_2010
+    tracks = _tracks(surveys)
+    empty = {
+        "crossovers": [],
+        "summary": {name: _summary(np.empty(0)) for name in CROSSOVER_VALUES},
+        "cell_size_m": cell_size_m,
+    }
+    if len(tracks) < (1 if include_self else 2):
+        return empty
+
+    lat0 = np.radians(np.mean(np.concatenate([t["lat"] for t in tracks])))
+    lon_ref = np.concatenate([t["lon"] for t in tracks]).mean()
+    seg_track, seg_idx, xs, ys, along = [], [], [], [], []
+    for track_id, track in enumerate(tracks):
+        x = EARTH_RADIUS_M * np.radians(track["lon"] - lon_ref) * np.cos(lat0)
+        y = EARTH_RADIUS_M * np.radians(track["lat"])
+        x, y, track["time_ms"] = _collapse_stationary(x, y, track["time_ms"].astype(np.float64), min_move_m)
+        # Distance along the track at the start of each segment.
+        along.append(np.concatenate(([0.0], np.cumsum(np.hypot(np.diff(x), np.diff(y)))))[:-1])
+        xs.append(x)
+        ys.append(y)
+        seg_track.append(np.full(len(x) - 1, track_id))
+        seg_idx.append(np.arange(len(x) - 1))
+    x0 = np.concatenate([x[:-1] for x in xs])
+    x1 = np.concatenate([x[1:] for x in xs])
+    y0 = np.concatenate([y[:-1] for y in ys])
+    y1 = np.concatenate([y[1:] for y in ys])
+    seg_track = np.concatenate(seg_track)
+    seg_idx = np.concatenate(seg_idx)
+    seg_along = np.concatenate(along)
+
+    lengths = np.hypot(x1 - x0, y1 - y0)
+    if cell_size_m is None:
+        moving = lengths[lengths > 0]
+        cell_size_m = max(float(np.median(moving)) * 4.0, 1.0) if len(moving) else 1.0
+    # Zero-length segments (stationary GPS) cannot cross anything.
+    active = np.flatnonzero(lengths > 0)
+    seg, cell, long_segments = _grid_entries(x0[active], y0[active], x1[active], y1[active], cell_size_m)
+    seg = active[seg]
+    long_segments = active[long_segments]
+    if include_self:
+        # Same-track pairs are allowed, but not neighbouring segments.
+        group = np.arange(len(x0))
+    else:
+        group = seg_track
+    hits, fa, fb = [], [], []
+    for pairs in _iter_candidate_pairs(seg, cell, long_segments, active, group):
+        if include_self:
+            pairs = pairs[(seg_track[pairs[:, 0]] != seg_track[pairs[:, 1]]) | (np.abs(pairs[:, 0] - pairs[:, 1]) > 1)]
+        pairs = np.sort(pairs, axis=1)
+        hit, t, u = _intersections(pairs, x0, y0, x1, y1)
+        hits.append(hit)
+        fa.append(t)
+        fb.append(u)
+    if not hits or not sum(len(h) for h in hits):
+        empty["cell_size_m"] = cell_size_m
+        return empty
+    hits = np.concatenate(hits)
+    # A pair sharing several cells is found once per cell.
+    hits, first = np.unique(hits, axis=0, return_index=True)
+    t = np.concatenate(fa)[first]
+    u = np.concatenate(fb)[first]
+    a, b = hits[:, 0], hits[:, 1]
+    # Merge along A then along B: jitter left on one line still crosses the
+    # other at (almost) the same place along that other line.
+    for side in ("a", "b"):
+        seg, frac = (a, t) if side == "a" else (b, u)
+        pair_key = seg_track[a] * len(tracks) + seg_track[b]
+        keep = _merge_close(seg_along[seg] + frac * lengths[seg], pair_key, merge_distance_m)
+        a, b, t, u = a[keep], b[keep], t[keep], u[keep]
+
+    if matched is None:
+        matched = [match_survey(survey, max_delta_ms) for survey in surveys]
+    sides = {}
+    for side, seg, frac in (("a", a, t), ("b", b, u)):
+        values = {name: np.full(len(seg), np.nan) for name in ("time_ms", "conductivity", "inphase")}
+        for track_id in np.unique(seg_track[seg]):
+            track = tracks[track_id]
+            rows = np.flatnonzero(seg_track[seg] == track_id)
+            i = seg_idx[seg[rows]]
+            times = track["time_ms"]
+            at = times[i] + frac[rows] * (times[i + 1] - times[i])
+            values["time_ms"][rows] = at
+            survey = surveys[track["file"]]
+            reading_idx = matched[track["file"]]["reading"]
+            on_line = reading_idx[survey.readings["line"][reading_idx] == track["line"]]
+            r_times = survey.readings["time_ms"][on_line].astype(np.float64)
+            for name in ("conductivity", "inphase"):
+                values[name][rows] = _interp_at(r_times, survey.readings[name][on_line], at, max_gap_ms)
+        values["thickness"] = predict_thickness(values["conductivity"], coeffs[0], coeffs[1], coeffs[2], inst_height)
+        sides[side] = values
+
+    lon_cross = lon_ref + np.degrees((x0[a] + t * (x1[a] - x0[a])) / (EARTH_RADIUS_M * np.cos(lat0)))
+    lat_cross = np.degrees((y0[a] + t * (y1[a] - y0[a])) / EARTH_RADIUS_M)
+    diffs = {name: sides["a"][name] - sides["b"][name] for name in CROSSOVER_VALUES}
+
+    def _num(value: float) -> Optional[float]:
+        return float(value) if np.isfinite(value) else None
+
+    crossovers = []
+    for k in range(len(a)):
+        entry: Dict[str, object] = {"lat": float(lat_cross[k]), "lon": float(lon_cross[k])}
+        for side, seg in (("a", a), ("b", b)):
+            track = tracks[seg_track[seg[k]]]
+            entry[side] = {
+                "file": track["file"],
+                "line_name": track["line_name"],
+                "time_ms": _num(sides[side]["time_ms"][k]),
+                **{name: _num(sides[side][name][k]) for name in CROSSOVER_VALUES},
+            }
+        entry["diff"] = {name: _num(diffs[name][k]) for name in CROSSOVER_VALUES}
+        crossovers.append(entry)
+    return {
+        "crossovers": crossovers,
+        "summary": {name: _summary(diffs[name]) for name in CROSSOVER_VALUES},
+        "cell_size_m": cell_size_m,
+    }
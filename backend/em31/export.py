@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator, List
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather  # noqa: F401
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = {
+    "csv": {"media_type": "text/csv", "extension": "csv", "requires_arrow": False},
+    "parquet": {"media_type": "application/vnd.apache.parquet", "extension": "parquet", "requires_arrow": True},
+    "feather": {"media_type": "application/vnd.apache.arrow.file", "extension": "feather", "requires_arrow": True},
+}
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+class _ChunkSink:
+    """
+    Write-only file object handed to the Arrow writers.
+    Bytes accumulate until `drain()` hands them to the HTTP stream.
+    """
+
+    def __init__(self) -> None:
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._parts.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def readable(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_csv(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header, lineterminator="\n").encode("utf-8")
+        header = False
+
+
+def _iter_arrow(chunks: Iterable[pd.DataFrame], fmt: str) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                if fmt == "parquet":
+                    writer = pq.ParquetWriter(sink, table.schema)
+                else:
+                    writer = pa.ipc.new_file(sink, table.schema)
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        if writer is not None:
+            writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def iter_export(chunks: Iterable[pd.DataFrame], fmt: str) -> Iterator[bytes]:
+    """
+    Encode table chunks as they are produced so the download never holds more
+    than one chunk in memory.
+    """
+    if fmt == "csv":
+        return iter_csv(chunks)
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if not arrow_available():
+        raise RuntimeError("pyarrow is required for Parquet/Feather export.")
+    return _iter_arrow(chunks, fmt)
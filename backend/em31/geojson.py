@@ -15,6 +15,44 @@ def compute_bounds(coords: List[Tuple[float, float]]) -> Optional[List[float]]:
     return [min(lons), min(lats), max(lons), max(lats)]
 
 
+def reading_feature(
+    line_name: Optional[str], reading: Reading, gps: GPSPoint, thickness: Optional[float]
+) -> Dict[str, object]:
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [gps.lon, gps.lat]},
+        "properties": {
+            "kind": "reading",
+            "line_name": line_name,
+            "time_ms": reading.time_ms,
+            "conductivity": reading.conductivity,
+            "inphase": reading.inphase,
+            "range": reading.range_value,
+            "dipole_mode": reading.dipole_mode,
+            "marker": reading.marker,
+            "station": reading.station,
+            "raw_reading1": reading.raw_reading1,
+            "raw_reading2": reading.raw_reading2,
+            "thickness": thickness,
+            "gps_quality": gps.quality,
+            "gps_satellites": gps.satellites,
+            "gps_hdop": gps.hdop,
+            "gps_altitude": gps.altitude,
+        },
+    }
+
+
+def track_feature(line_name: Optional[str], gps_points: List[GPSPoint]) -> Dict[str, object]:
+    return {
+        "type": "Feature",
+        "geometry": {"type": "LineString", "coordinates": [[p.lon, p.lat] for p in gps_points]},
+        "properties": {
+            "kind": "track",
+            "line_name": line_name,
+        },
+    }
+
+
 def build_feature_collection(
     lines: List[LineRecord],
     max_delta_ms: int = 1000,
@@ -33,45 +71,11 @@ def build_feature_collection(
         )
         thickness_iter = iter(thickness_values)
         for reading, gps in matched:
-            coords = [gps.lon, gps.lat]
             all_coords.append((gps.lon, gps.lat))
-            features.append(
-                {
-                    "type": "Feature",
-                    "geometry": {"type": "Point", "coordinates": coords},
-                    "properties": {
-                        "kind": "reading",
-                        "line_name": line.line_name,
-                        "time_ms": reading.time_ms,
-                        "conductivity": reading.conductivity,
-                        "inphase": reading.inphase,
-                        "range": reading.range_value,
-                        "dipole_mode": reading.dipole_mode,
-                        "marker": reading.marker,
-                        "station": reading.station,
-                        "raw_reading1": reading.raw_reading1,
-                        "raw_reading2": reading.raw_reading2,
-                        "thickness": next(thickness_iter, None),
-                        "gps_quality": gps.quality,
-                        "gps_satellites": gps.satellites,
-                        "gps_hdop": gps.hdop,
-                        "gps_altitude": gps.altitude,
-                    },
-                }
-            )
+            features.append(reading_feature(line.line_name, reading, gps, next(thickness_iter, None)))
         coords_sorted = sorted(line.gps_points, key=lambda g: g.time_ms)
         if coords_sorted:
-            track_coords = [[p.lon, p.lat] for p in coords_sorted]
             all_coords.extend((p.lon, p.lat) for p in coords_sorted)
-            features.append(
-                {
-                    "type": "Feature",
-                    "geometry": {"type": "LineString", "coordinates": track_coords},
-                    "properties": {
-                        "kind": "track",
-                        "line_name": line.line_name,
-                    },
-                }
-            )
+            features.append(track_feature(line.line_name, coords_sorted))
     bounds = compute_bounds(all_coords)
     return {"type": "FeatureCollection", "features": features, "bounds": bounds}
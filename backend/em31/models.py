@@ -46,6 +46,7 @@ class GPSPoint:
     quality: Optional[int] = None
     satellites: Optional[int] = None
     altitude: Optional[float] = None
+    utc_seconds: Optional[float] = None
 
 
 @dataclass
@@ -183,9 +183,21 @@ def parse_gga_sentence(sentence: str) -> Optional[Tuple[float, float, Dict[str,
     meta["satellites"] = safe_int(parts[7])
     meta["hdop"] = safe_float(parts[8])
     meta["altitude"] = safe_float(parts[9])
+    meta["utc_seconds"] = parse_gga_time(parts[1])
     return lat, lon, meta
 
 
+def parse_gga_time(value: str) -> Optional[float]:
+    """GGA `hhmmss.ss` UTC time as seconds since midnight."""
+    match = re.match(r"^(\d{2})(\d{2})(\d{2}(?:\.\d+)?)$", value.strip())
+    if not match:
+        return None
+    hours, minutes, seconds = int(match.group(1)), int(match.group(2)), float(match.group(3))
+    if hours > 23 or minutes > 59 or seconds >= 61:
+        return None
+    return hours * 3600 + minutes * 60 + seconds
+
+
 def safe_int(value: Optional[str]) -> Optional[int]:
     if value is None:
         return None
@@ -212,77 +224,93 @@ def ensure_line(lines: List[LineRecord]) -> LineRecord:
     return line
 
 
+class R31StreamParser:
+    """
+    Line-by-line R31 decoder. State (current line, station, pending GPS block)
+    is kept between calls so records can be fed as they are written.
+    """
+
+    def __init__(self) -> None:
+        self.header = Header()
+        self.lines: List[LineRecord] = []
+        self.gps_buffer: List[str] = []
+        self.current_station: Optional[float] = None
+
+    def feed_line(self, raw_line: str) -> None:
+        line = raw_line.strip("\r\n")
+        if not line:
+            return
+        lines = self.lines
+        rec_type = line[0]
+        if rec_type == "E":
+            self.header = parse_header_e(line, self.header)
+        elif rec_type == "H":
+            self.header = parse_header_h(line, self.header)
+        elif rec_type == "L":
+            line_rec = LineRecord(line_name=line[1:].strip())
+            lines.append(line_rec)
+        elif rec_type == "B":
+            line_rec = ensure_line(lines)
+            line_rec.start_station = safe_float(line[1:].strip())
+        elif rec_type == "A":
+            line_rec = ensure_line(lines)
+            direction = line[1:2]
+            station_inc = safe_float(line[2:].strip())
+            line_rec.direction = direction
+            line_rec.station_increment = station_inc
+        elif rec_type == "Z":
+            line_rec = ensure_line(lines)
+            line_rec.created_at = parse_line_created_at(line)
+        elif rec_type == "*":
+            line_rec = ensure_line(lines)
+            timer = parse_timer_relation(line)
+            if timer:
+                line_rec.timer_relations.append(timer)
+        elif rec_type in ("T", "2"):
+            line_rec = ensure_line(lines)
+            reading = parse_reading_line(line, self.header, self.current_station)
+            if reading:
+                line_rec.readings.append(reading)
+        elif rec_type == "S":
+            station_str = line[1:12]
+            self.current_station = safe_float(station_str.strip())
+        elif rec_type in ("@", "#", "!"):
+            line_rec = ensure_line(lines)
+            gps_payload = line[1:]
+            if rec_type == "@":
+                self.gps_buffer = [gps_payload]
+            elif rec_type == "#":
+                self.gps_buffer.append(gps_payload)
+            else:
+                timestamp_match = re.search(r"(\d{1,10})$", line)
+                time_ms = int(timestamp_match.group(1)) if timestamp_match else None
+                sentence = "".join(self.gps_buffer).strip()
+                parsed = parse_gga_sentence(sentence)
+                if parsed and time_ms is not None:
+                    lat, lon, meta = parsed
+                    gps_point = GPSPoint(
+                        time_ms=time_ms,
+                        lat=lat,
+                        lon=lon,
+                        hdop=meta.get("hdop"),
+                        quality=meta.get("quality"),
+                        satellites=meta.get("satellites"),
+                        altitude=meta.get("altitude"),
+                        utc_seconds=meta.get("utc_seconds"),
+                    )
+                    line_rec.gps_points.append(gps_point)
+                self.gps_buffer = []
+
+    def result(self) -> Dict[str, object]:
+        return {"header": self.header, "lines": self.lines}
+
+
 def parse_em31_file(path: Path) -> Dict[str, object]:
-    header = Header()
-    lines: List[LineRecord] = []
-    gps_buffer: List[str] = []
-    current_station: Optional[float] = None
+    parser = R31StreamParser()
     with open(path, "r", errors="ignore") as f:
         for raw_line in f:
-            line = raw_line.strip("\r\n")
-            if not line:
-                continue
-            rec_type = line[0]
-            if rec_type == "E":
-                header = parse_header_e(line, header)
-            elif rec_type == "H":
-                header = parse_header_h(line, header)
-            elif rec_type == "L":
-                line_rec = LineRecord(line_name=line[1:].strip())
-                lines.append(line_rec)
-            elif rec_type == "B":
-                line_rec = ensure_line(lines)
-                line_rec.start_station = safe_float(line[1:].strip())
-            elif rec_type == "A":
-                line_rec = ensure_line(lines)
-                direction = line[1:2]
-                station_inc = safe_float(line[2:].strip())
-                line_rec.direction = direction
-                line_rec.station_increment = station_inc
-            elif rec_type == "Z":
-                line_rec = ensure_line(lines)
-                line_rec.created_at = parse_line_created_at(line)
-            elif rec_type == "*":
-                line_rec = ensure_line(lines)
-                timer = parse_timer_relation(line)
-                if timer:
-                    line_rec.timer_relations.append(timer)
-            elif rec_type in ("T", "2"):
-                line_rec = ensure_line(lines)
-                reading = parse_reading_line(line, header, current_station)
-                if reading:
-                    line_rec.readings.append(reading)
-            elif rec_type == "S":
-                station_str = line[1:12]
-                current_station = safe_float(station_str.strip())
-            elif rec_type in ("@", "#", "!"):
-                line_rec = ensure_line(lines)
-                gps_payload = line[1:]
-                if rec_type == "@":
-                    gps_buffer = [gps_payload]
-                elif rec_type == "#":
-                    gps_buffer.append(gps_payload)
-                else:
-                    timestamp_match = re.search(r"(\d{1,10})$", line)
-                    time_ms = int(timestamp_match.group(1)) if timestamp_match else None
-                    sentence = "".join(gps_buffer).strip()
-                    parsed = parse_gga_sentence(sentence)
-                    if parsed and time_ms is not None:
-                        lat, lon, meta = parsed
-                        gps_point = GPSPoint(
-                            time_ms=time_ms,
-                            lat=lat,
-                            lon=lon,
-                            hdop=meta.get("hdop"),
-                            quality=meta.get("quality"),
-                            satellites=meta.get("satellites"),
-                            altitude=meta.get("altitude"),
-                        )
-                        line_rec.gps_points.append(gps_point)
-                    gps_buffer = []
-            else:
-                continue
-    return {"header": header, "lines": lines}
+            parser.feed_line(raw_line)
+    return parser.result()
 
 
 def match_readings_to_gps(
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from .columns import ColumnarSurvey
+from .models import Header, LineRecord, TimerRelation
+
+DEFAULT_SESSION_DIR = Path(tempfile.gettempdir()) / "em31-sessions"
+# Discarded sessions are renamed to this prefix before deletion; files still
+# memory-mapped (Windows cannot delete them) are retried on later prunes.
+TRASH_PREFIX = ".trash-"
+
+
+def _line_to_json(line: LineRecord) -> Dict[str, object]:
+    return {
+        "line_name": line.line_name,
+        "start_station": line.start_station,
+        "station_increment": line.station_increment,
+        "direction": line.direction,
+        "created_at": line.created_at.isoformat() if line.created_at else None,
+        "timer_relations": [asdict(timer) for timer in line.timer_relations],
+    }
+
+
+def _line_from_json(data: Dict[str, object]) -> LineRecord:
+    created_at = data.get("created_at")
+    return LineRecord(
+        line_name=data.get("line_name"),
+        start_station=data.get("start_station"),
+        station_increment=data.get("station_increment"),
+        direction=data.get("direction"),
+        created_at=datetime.fromisoformat(created_at) if created_at else None,
+        timer_relations=[TimerRelation(**timer) for timer in data.get("timer_relations", [])],
+    )
+
+
+def _save_columns(directory: Path, prefix: str, columns: Dict[str, np.ndarray]) -> None:
+    for name, values in columns.items():
+        np.save(directory / f"{prefix}.{name}.npy", np.ascontiguousarray(values), allow_pickle=False)
+
+
+def _load_columns(directory: Path, prefix: str) -> Dict[str, np.ndarray]:
+    columns = {}
+    for path in sorted(directory.glob(f"{prefix}.*.npy")):
+        name = path.name[len(prefix) + 1 : -len(".npy")]
+        # Memory-mapped: every worker shares the same pages through the OS cache.
+        columns[name] = np.load(path, mmap_mode="r", allow_pickle=False)
+    return columns
+
+
+class SessionStore:
+    """
+    Parsed surveys shared by every backend worker.
+
+    Each session is a directory of memory-mapped `.npy` column files plus a
+    `meta.json` (header and line metadata), so any worker process can answer
+    follow-up requests (export, calibration...) without re-parsing.
+    Derived arrays are cached next to the columns under `derived/`.
+    The least recently used sessions are removed beyond `max_sessions`;
+    only directories with a `meta.json` count as sessions.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_sessions: int = 8) -> None:
+        self.root = Path(root) if root else DEFAULT_SESSION_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_sessions = max_sessions
+        self._loaded: "OrderedDict[str, ColumnarSurvey]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, session_id: str) -> Path:
+        if not session_id or not session_id.isalnum():
+            raise KeyError(session_id)
+        return self.root / session_id
+
+    def add(self, survey: ColumnarSurvey) -> str:
+        session_id = uuid.uuid4().hex
+        staging = Path(tempfile.mkdtemp(prefix=f".{session_id}-", dir=self.root))
+        _save_columns(staging, "readings", survey.readings)
+        _save_columns(staging, "gps", survey.gps)
+        meta = {
+            "header": asdict(survey.header),
+            "lines": [_line_to_json(line) for line in survey.lines],
+        }
+        (staging / "meta.json").write_text(json.dumps(meta))
+        (staging / "derived").mkdir()
+        os.replace(staging, self.root / session_id)
+        self._prune()
+        return session_id
+
+    def get(self, session_id: str) -> Optional[ColumnarSurvey]:
+        try:
+            directory = self._path(session_id)
+        except KeyError:
+            return None
+        with self._lock:
+            survey = self._loaded.get(session_id)
+        if survey is not None and directory.exists():
+            self._touch(directory)
+            return survey
+        meta_path = directory / "meta.json"
+        try:
+            meta = json.loads(meta_path.read_text())
+            survey = ColumnarSurvey(
+                header=Header(**meta["header"]),
+                lines=[_line_from_json(line) for line in meta["lines"]],
+                readings=_load_columns(directory, "readings"),
+                gps=_load_columns(directory, "gps"),
+            )
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        self._touch(directory)
+        with self._lock:
+            self._loaded[session_id] = survey
+            while len(self._loaded) > self.max_sessions:
+                self._loaded.popitem(last=False)
+        return survey
+
+    def cached(
+        self,
+        session_id: str,
+        key: str,
+        compute: Callable[[], Dict[str, np.ndarray]],
+    ) -> Dict[str, np.ndarray]:
+        """
+        Return the derived arrays stored under `key`, computing and storing
+        them on first use. Each key is published with one atomic rename, so a
+        worker never sees a half-written result; if two workers race, the
+        first complete write is kept.
+        """
+        derived = self._path(session_id) / "derived"
+        target = derived / key
+        if target.is_dir():
+            return _load_columns(target, "col")
+        result = compute()
+        if derived.is_dir():
+            staging = Path(tempfile.mkdtemp(prefix=f".{key}-", dir=derived))
+            _save_columns(staging, "col", result)
+            try:
+                os.replace(staging, target)
+            except OSError:
+                shutil.rmtree(staging, ignore_errors=True)
+        return result
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            self._loaded.pop(session_id, None)
+        try:
+            directory = self._path(session_id)
+        except KeyError:
+            return
+        trash = self.root / f"{TRASH_PREFIX}{session_id}-{uuid.uuid4().hex[:8]}"
+        try:
+            os.replace(directory, trash)
+        except FileNotFoundError:
+            return
+        except OSError:
+            # Windows refuses to move a directory with mapped files: removing
+            # meta.json below is enough to retire the session.
+            trash = directory
+        self._remove(trash)
+
+    @staticmethod
+    def _remove(directory: Path) -> None:
+        shutil.rmtree(directory, ignore_errors=True)
+        try:
+            (directory / "meta.json").unlink()
+        except OSError:
+            pass
+
+    def _sweep(self) -> None:
+        """Retry deleting trashed sessions and half-deleted session directories."""
+        for path in self.root.iterdir():
+            if path.name.startswith(TRASH_PREFIX):
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.is_dir() and not path.name.startswith(".") and not (path / "meta.json").exists():
+                shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _touch(directory: Path) -> None:
+        now = time.time()
+        try:
+            os.utime(directory, (now, now))
+        except FileNotFoundError:
+            pass
+
+    def _session_dirs(self):
+        # Sessions are published complete by one rename; a directory without
+        # meta.json is a session whose deletion is still pending.
+        return [
+            path
+            for path in self.root.iterdir()
+            if not path.name.startswith(".") and (path / "meta.json").is_file()
+        ]
+
+    @staticmethod
+    def _mtime(path: Path) -> float:
+        try:
+            return path.stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    def _prune(self) -> None:
+        self._sweep()
+        sessions = sorted(self._session_dirs(), key=self._mtime)
+        for path in sessions[: max(len(sessions) - self.max_sessions, 0)]:
+            self.discard(path.name)
+
+    def __len__(self) -> int:
+        return len(self._session_dirs())
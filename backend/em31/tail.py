@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .columns import ColumnarSurvey, nearest_gps_index, survey_from_parsed
+from .geojson import compute_bounds, reading_feature
+from .parser import R31StreamParser
+from .thickness_adapter import compute_thickness
+
+
+class R31Tail:
+    """
+    Follow an R31 file that is still being recorded.
+
+    Each `poll()` reads only the bytes appended since the previous call and
+    feeds complete records to an `R31StreamParser`, so a GPS block (`@`/`#`/`!`)
+    or a record split across two writes is resumed where it stopped.
+    A reading is matched once a later GPS fix exists on its line (no future
+    fix can be nearer) or once its line is closed by a new `L` record.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_delta_ms: int = 1000,
+        inst_height: float = 0.15,
+        coeffs: Optional[List[float]] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.max_delta_ms = max_delta_ms
+        self.inst_height = inst_height
+        self.coeffs = coeffs
+        self._reset()
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self._partial = b""
+        self.parser = R31StreamParser()
+        self._next_reading: List[int] = []
+        self._next_gps: List[int] = []
+
+    def _read_new_bytes(self) -> bytes:
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return b""
+        if size < self.offset:
+            # File truncated or replaced: start over.
+            self._reset()
+        if size == self.offset:
+            return b""
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+        return data
+
+    def poll(self) -> Dict[str, object]:
+        """
+        Parse newly appended records and return the reading features and
+        track points that became final since the last call.
+        """
+        data = self._partial + self._read_new_bytes()
+        cut = data.rfind(b"\n") + 1
+        self._partial = data[cut:]
+        if cut:
+            for raw_line in data[:cut].decode("utf-8", errors="ignore").split("\n"):
+                self.parser.feed_line(raw_line)
+
+        lines = self.parser.lines
+        while len(self._next_reading) < len(lines):
+            self._next_reading.append(0)
+            self._next_gps.append(0)
+
+        features: List[Dict[str, object]] = []
+        tracks: List[Dict[str, object]] = []
+        for idx, line in enumerate(lines):
+            closed = idx < len(lines) - 1
+            features.extend(self._match_pending(idx, closed))
+            new_points = line.gps_points[self._next_gps[idx]:]
+            if new_points:
+                self._next_gps[idx] = len(line.gps_points)
+                tracks.append(
+                    {
+                        "line_name": line.line_name,
+                        "coordinates": [[p.lon, p.lat] for p in new_points],
+                    }
+                )
+        coords = [tuple(f["geometry"]["coordinates"]) for f in features]
+        return {
+            "header": asdict(self.parser.header),
+            "lines": [
+                {
+                    "line_name": line.line_name,
+                    "readings": len(line.readings),
+                    "gps_points": len(line.gps_points),
+                    "created_at": line.created_at.isoformat() if line.created_at else None,
+                }
+                for line in lines
+            ],
+            "features": features,
+            "tracks": tracks,
+            "bounds": compute_bounds(coords),
+        }
+
+    def survey(self) -> ColumnarSurvey:
+        """
+        Columnar snapshot of everything parsed so far, for a server session.
+        Readings are matched like an uploaded file, so row ids line up with
+        the features already streamed by `poll()`.
+        """
+        return survey_from_parsed({"header": self.parser.header, "lines": self.parser.lines})
+
+    def _match_pending(self, idx: int, closed: bool) -> List[Dict[str, object]]:
+        line = self.parser.lines[idx]
+        start = self._next_reading[idx]
+        pending = line.readings[start:]
+        if not pending or not line.gps_points:
+            if closed:
+                self._next_reading[idx] = len(line.readings)
+            return []
+        gps_times = [g.time_ms for g in line.gps_points]
+        if closed:
+            ready = len(pending)
+        else:
+            last_gps = gps_times[-1]
+            ready = 0
+            while ready < len(pending) and pending[ready].time_ms < last_gps:
+                ready += 1
+        if not ready:
+            return []
+        self._next_reading[idx] = start + ready
+        pending = pending[:ready]
+        # Only the fixes around the pending readings are relevant.
+        lo = bisect_left(gps_times, pending[0].time_ms - self.max_delta_ms)
+        lo = max(lo - 1, 0)
+        window = np.asarray(gps_times[lo:], dtype=np.int64)
+        reading_times = np.asarray([r.time_ms for r in pending], dtype=np.int64)
+        nearest = nearest_gps_index(reading_times, window, self.max_delta_ms)
+        matched = [(r, line.gps_points[lo + int(g)]) for r, g in zip(pending, nearest) if g >= 0]
+        if not matched:
+            return []
+        thickness_values = compute_thickness(
+            [r.conductivity for r, _ in matched],
+            inst_height=self.inst_height,
+            coeffs=self.coeffs,
+        )
+        return [
+            reading_feature(line.line_name, reading, gps, value)
+            for (reading, gps), value in zip(matched, thickness_values)
+        ]
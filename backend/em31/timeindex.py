@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .columns import ColumnarSurvey, match_survey
+
+DAY_MS = 86_400_000.0
+# A jump of the (UTC - instrument) offset larger than this starts a new clock segment.
+DEFAULT_BREAK_MS = 1000.0
+# Shorter segments keep a constant offset: their drift estimate would be mostly jitter.
+MIN_DRIFT_SPAN_MS = 60_000.0
+# The PC clock runs on local time; time zones are whole quarter hours
+# between UTC-12 and UTC+14, i.e. UTC minus local time within this range.
+ZONE_STEP_MS = 900_000.0
+ZONE_RANGE_MS = (-14 * 3_600_000.0, 12 * 3_600_000.0)
+# GGA-minus-PC differences farther than this from the file's offset come
+# from a receiver clock that has not synced yet (or a PC clock reset).
+ZONE_TOLERANCE_MS = 3_600_000.0
+
+TIME_SOURCES = ("none", "created_at", "pc_clock", "pc_clock_corrected", "gps", "created_at_corrected")
+SOURCE_CODES = {name: code for code, name in enumerate(TIME_SOURCES)}
+# Sources that are true UTC; the others are PC local time read as UTC.
+UTC_SOURCES = ("gps", "pc_clock_corrected", "created_at_corrected")
+
+
+def epoch_ms(moment: datetime) -> float:
+    """Milliseconds since the Unix epoch; naive datetimes are read as UTC."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp() * 1000.0
+
+
+def iso_utc(value_ms: float) -> Optional[str]:
+    if not np.isfinite(value_ms):
+        return None
+    return datetime.fromtimestamp(value_ms / 1000.0, tz=timezone.utc).isoformat(timespec="milliseconds")
+
+
+def iso_local(value_ms: float) -> Optional[str]:
+    """Like `iso_utc` for PC local times: no UTC offset in the string."""
+    if not np.isfinite(value_ms):
+        return None
+    moment = datetime.fromtimestamp(value_ms / 1000.0, tz=timezone.utc).replace(tzinfo=None)
+    return moment.isoformat(timespec="milliseconds")
+
+
+def clock_ms(pc_time: str) -> Optional[float]:
+    """`HH:MM:SS.fff` of a timer relation as milliseconds since midnight."""
+    match = re.match(r"^(\d{1,2}):(\d{2}):(\d{2}(?:\.\d+)?)$", pc_time.strip())
+    if not match:
+        return None
+    return (int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3))) * 1000.0
+
+
+def nearest_day(time_of_day_ms: np.ndarray, estimate_ms: np.ndarray) -> np.ndarray:
+    """
+    Absolute times having the given time of day, each on the day that brings
+    it closest to its estimate (handles midnight roll-over).
+    """
+    return time_of_day_ms + np.round((estimate_ms - time_of_day_ms) / DAY_MS) * DAY_MS
+
+
+def wrap_day(value_ms: np.ndarray) -> np.ndarray:
+    """Time differences brought into [-12 h, 12 h)."""
+    return np.mod(value_ms + DAY_MS / 2, DAY_MS) - DAY_MS / 2
+
+
+def synced_fixes(diff_ms: np.ndarray, tolerance_ms: float = ZONE_TOLERANCE_MS) -> np.ndarray:
+    """
+    Mask of the fixes of one line, in time order, whose GGA-minus-PC
+    difference agrees with the line's last clock segment. A receiver that
+    has not synced yet reports its own clock (often from 00:00:00) and jumps
+    to UTC once it has; it does not jump back.
+    """
+    if not len(diff_ms):
+        return np.zeros(0, dtype=bool)
+    jumps = np.flatnonzero(np.abs(wrap_day(np.diff(diff_ms))) > tolerance_ms)
+    last = jumps[-1] + 1 if len(jumps) else 0
+    tail = wrap_day(diff_ms[last:] - diff_ms[-1])
+    reference = diff_ms[-1] + np.median(tail)
+    return np.abs(wrap_day(diff_ms - reference)) <= tolerance_ms
+
+
+def zone_offset(time_of_day_ms: np.ndarray, local_ms: np.ndarray, lon: Optional[np.ndarray] = None) -> Optional[float]:
+    """
+    UTC minus PC local time, from GGA times of day and the PC clock estimates
+    of the same fixes: the dominant time-of-day difference (most frequent
+    quarter hour, refined by the median of the fixes within
+    `ZONE_TOLERANCE_MS` of it), rounded to 15 minutes. The difference is
+    only known modulo a day; of the values that are real zones, the one
+    nearest the nominal zone of the fixes' longitude (15 degrees per hour)
+    is kept.
+    """
+    if not len(time_of_day_ms):
+        return None
+    center = 0.0
+    if lon is not None and np.isfinite(lon).any():
+        center = -float(np.nanmedian(lon)) / 15.0 * 3_600_000.0
+    diff = wrap_day(time_of_day_ms - local_ms - center) + center
+    steps, counts = np.unique(np.round(diff / ZONE_STEP_MS), return_counts=True)
+    dominant = steps[counts == counts.max()] * ZONE_STEP_MS
+    dominant = dominant[np.argmin(np.abs(dominant - center))]
+    close = np.abs(diff - dominant) <= ZONE_TOLERANCE_MS
+    offset = np.median(diff[close])
+    candidates = np.round((offset + np.array([-DAY_MS, 0.0, DAY_MS])) / ZONE_STEP_MS) * ZONE_STEP_MS
+    candidates = candidates[(candidates >= ZONE_RANGE_MS[0]) & (candidates <= ZONE_RANGE_MS[1])]
+    return float(candidates[np.argmin(np.abs(candidates - center))])
+
+
+def fit_clock(ms: np.ndarray, utc_ms: np.ndarray, break_ms: float = DEFAULT_BREAK_MS) -> Dict[str, np.ndarray]:
+    """
+    Piecewise-linear fit of the offset `utc_ms - ms` against instrument time.
+    A new segment starts wherever consecutive anchors disagree by more than
+    `break_ms` (timer reset, GPS outage); each segment is a least-squares line,
+    whose slope absorbs the drift of the instrument clock.
+    """
+    order = np.argsort(ms, kind="stable")
+    ms = np.asarray(ms, dtype=np.float64)[order]
+    offset = np.asarray(utc_ms, dtype=np.float64)[order] - ms
+    starts = np.concatenate(([0], np.flatnonzero(np.abs(np.diff(offset)) > break_ms) + 1))
+    counts = np.diff(np.append(starts, len(ms)))
+    origin = ms[starts]
+    x = ms - np.repeat(origin, counts)
+    n = counts.astype(np.float64)
+    sx = np.add.reduceat(x, starts)
+    sy = np.add.reduceat(offset, starts)
+    sxx = np.add.reduceat(x * x, starts)
+    sxy = np.add.reduceat(x * offset, starts)
+    denom = n * sxx - sx * sx
+    span = np.maximum.reduceat(x, starts)
+    slope = np.zeros(len(starts))
+    drift = (denom > 0) & (span >= MIN_DRIFT_SPAN_MS)
+    slope[drift] = (n[drift] * sxy[drift] - sx[drift] * sy[drift]) / denom[drift]
+    intercept = (sy - slope * sx) / n
+    residual = offset - (np.repeat(intercept, counts) + np.repeat(slope, counts) * x)
+    return {
+        "start": origin,
+        "intercept": intercept,
+        "slope": slope,
+        "rms_ms": np.array([np.sqrt(np.mean(residual**2))]),
+    }
+
+
+def apply_clock(clock: Dict[str, np.ndarray], ms: np.ndarray) -> np.ndarray:
+    """Map instrument milliseconds to UTC epoch milliseconds with a `fit_clock` result."""
+    ms = np.asarray(ms, dtype=np.float64)
+    seg = np.maximum(np.searchsorted(clock["start"], ms, side="right") - 1, 0)
+    return ms + clock["intercept"][seg] + clock["slope"][seg] * (ms - clock["start"][seg])
+
+
+def _pc_anchors(line, created: Optional[float]) -> Optional[Dict[str, np.ndarray]]:
+    timers = [(clock_ms(t.pc_time), t.time_ms) for t in line.timer_relations]
+    timers = [(tod, ms) for tod, ms in timers if tod is not None]
+    if created is None or not timers:
+        return None
+    tod = np.array([t[0] for t in timers])
+    ms = np.array([t[1] for t in timers], dtype=np.float64)
+    # The line header (Z record) is written when the first relation is taken.
+    return {"ms": ms, "utc_ms": nearest_day(tod, created + (ms - ms[0]))}
+
+
+def reconstruct_times(survey: ColumnarSurvey, break_ms: float = DEFAULT_BREAK_MS) -> Dict[str, np.ndarray]:
+    """
+    Absolute time (epoch ms, NaN when unknown) of every reading, per line:
+
+    - `gps`: piecewise fit on the GGA UTC times of the line's fixes; the date,
+      absent from GGA, is the one closest to the PC clock estimate once moved
+      to UTC by the file's time zone offset (`utc_offset_ms`);
+    - `pc_clock`: the `*` timer relations on the `created_at` date;
+    - `created_at`: the line creation time taken at its first record.
+
+    The PC clock is local time: the last two are shifted by the PC-to-GPS
+    offset measured on the GPS lines of the file when there are any
+    (`*_corrected`), and are otherwise local times, not UTC (see `UTC_SOURCES`).
+    """
+    r = survey.readings
+    g = survey.gps
+    r_line = r.get("line", np.empty(0, dtype=np.int32))
+    r_ms = r.get("time_ms", np.empty(0, dtype=np.int64)).astype(np.float64)
+    g_line = g.get("line", np.empty(0, dtype=np.int32))
+    g_ms = g.get("time_ms", np.empty(0, dtype=np.int64)).astype(np.float64)
+    g_utc = g.get("utc_seconds", np.full(len(g_ms), np.nan)) * 1000.0
+    n_lines = len(survey.lines)
+    clocks: List[Optional[Dict[str, np.ndarray]]] = [None] * n_lines
+    source = np.zeros(n_lines, dtype=np.int8)
+    pc_anchors: List[Optional[Dict[str, np.ndarray]]] = [None] * n_lines
+    # Per GPS line: fix rows (time order) and PC local estimates of their times.
+    estimates: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    g_order = np.argsort(g_ms, kind="stable")
+    for idx, line in enumerate(survey.lines):
+        created = epoch_ms(line.created_at) if line.created_at else None
+        pc = _pc_anchors(line, created)
+        in_line = g_line == idx
+        fixes = g_order[(in_line & np.isfinite(g_utc))[g_order]]
+        if pc is not None:
+            pc_anchors[idx] = pc
+            clocks[idx] = fit_clock(pc["ms"], pc["utc_ms"], break_ms)
+            source[idx] = SOURCE_CODES["pc_clock"]
+            if len(fixes):
+                estimates[idx] = (fixes, apply_clock(clocks[idx], g_ms[fixes]))
+        elif created is not None:
+            first = np.concatenate((r_ms[r_line == idx], g_ms[in_line]))
+            if len(first):
+                pc_anchors[idx] = {"ms": first.min(keepdims=True), "utc_ms": np.array([created])}
+                clocks[idx] = fit_clock(pc_anchors[idx]["ms"], pc_anchors[idx]["utc_ms"], break_ms)
+                source[idx] = SOURCE_CODES["created_at"]
+                if len(fixes):
+                    estimates[idx] = (fixes, created + (g_ms[fixes] - pc_anchors[idx]["ms"][0]))
+    # Fixes taken before the receiver clock synced carry wrong GGA times.
+    for idx, (fixes, local) in list(estimates.items()):
+        synced = synced_fixes(g_utc[fixes] - local)
+        estimates[idx] = (fixes[synced], local[synced])
+    utc_offset = None
+    if estimates:
+        lon = None
+        if "lon" in g:
+            # 0/0 is what receivers report without a position.
+            lon = np.where((g["lat"] == 0) & (g["lon"] == 0), np.nan, g["lon"])
+        utc_offset = zone_offset(
+            np.concatenate([g_utc[fixes] for fixes, _ in estimates.values()]),
+            np.concatenate([local for _, local in estimates.values()]),
+            np.concatenate([lon[fixes] for fixes, _ in estimates.values()]) if lon is not None else None,
+        )
+    pc_shift: List[np.ndarray] = []
+    for idx, (fixes, local) in estimates.items():
+        agree = np.abs(wrap_day(g_utc[fixes] - local - utc_offset)) <= ZONE_TOLERANCE_MS
+        if not agree.any():
+            # Lines whose GPS clock disagrees with the rest of the file keep the PC clock.
+            continue
+        fixes, local = fixes[agree], local[agree]
+        clocks[idx] = fit_clock(g_ms[fixes], nearest_day(g_utc[fixes], local + utc_offset), break_ms)
+        source[idx] = SOURCE_CODES["gps"]
+        pc = pc_anchors[idx]
+        pc_shift.append(apply_clock(clocks[idx], pc["ms"]) - pc["utc_ms"])
+    if pc_shift:
+        shift = float(np.median(np.concatenate(pc_shift)))
+        for name in ("pc_clock", "created_at"):
+            for idx in np.flatnonzero(source == SOURCE_CODES[name]):
+                clock = dict(clocks[idx])
+                clock["intercept"] = clock["intercept"] + shift
+                clocks[idx] = clock
+                source[idx] = SOURCE_CODES[f"{name}_corrected"]
+    utc_ms = np.full(len(r_ms), np.nan)
+    rms_ms = np.full(n_lines, np.nan)
+    segments = np.zeros(n_lines, dtype=np.int32)
+    line_start = np.full(n_lines, np.nan)
+    line_end = np.full(n_lines, np.nan)
+    for idx, clock in enumerate(clocks):
+        if clock is None:
+            continue
+        rows = r_line == idx
+        utc_ms[rows] = times = apply_clock(clock, r_ms[rows])
+        if len(times):
+            line_start[idx], line_end[idx] = times.min(), times.max()
+        rms_ms[idx] = clock["rms_ms"][0]
+        segments[idx] = len(clock["start"])
+    return {
+        "utc_ms": utc_ms,
+        "line_source": source,
+        "line_rms_ms": rms_ms,
+        "line_segments": segments,
+        "line_start_ms": line_start,
+        "line_end_ms": line_end,
+        "utc_offset_ms": np.array([np.nan if utc_offset is None else utc_offset]),
+    }
+
+
+def build_time_index(survey: ColumnarSurvey, break_ms: float = DEFAULT_BREAK_MS) -> Dict[str, np.ndarray]:
+    """
+    `reconstruct_times` plus the readings with a known UTC time sorted by it:
+    `order` (reading indices) and `sorted_utc_ms`, ready for `time_window`.
+    Lines only known in PC local time are left out so that files recorded in
+    different time zones merge correctly.
+    """
+    index = reconstruct_times(survey, break_ms)
+    utc_ms = index["utc_ms"]
+    utc_codes = [SOURCE_CODES[name] for name in UTC_SOURCES]
+    line_is_utc = np.isin(index["line_source"], utc_codes)
+    reading_line = survey.readings.get("line", np.empty(0, dtype=np.int32))
+    known = np.flatnonzero(np.isfinite(utc_ms) & line_is_utc[reading_line])
+    order = known[np.argsort(utc_ms[known], kind="stable")]
+    index["order"] = order
+    index["sorted_utc_ms"] = utc_ms[order]
+    return index
+
+
+def time_window(index: Dict[str, np.ndarray], start_ms: Optional[float], end_ms: Optional[float]) -> np.ndarray:
+    """Reading indices with `start_ms <= utc < end_ms`, in time order (binary search)."""
+    sorted_utc = index["sorted_utc_ms"]
+    lo = 0 if start_ms is None else int(np.searchsorted(sorted_utc, start_ms, side="left"))
+    hi = len(sorted_utc) if end_ms is None else int(np.searchsorted(sorted_utc, end_ms, side="left"))
+    return np.asarray(index["order"][lo:max(hi, lo)])
+
+
+def merge_time_ordered(times: Sequence[np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Merge already sorted time arrays (one per file) into one time-ordered
+    view: returns the `source` array index and the `position` inside it.
+    The stable sort runs on concatenated sorted runs, which it merges.
+    """
+    if not times:
+        empty = np.empty(0, dtype=np.int64)
+        return {"source": empty, "position": empty}
+    lengths = [len(t) for t in times]
+    merged = np.argsort(np.concatenate(times), kind="stable")
+    source = np.repeat(np.arange(len(times)), lengths)[merged]
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return {"source": source, "position": merged - offsets[source]}
+
+
+def timeline_table(
+    surveys: Sequence[ColumnarSurvey],
+    indexes: Sequence[Dict[str, np.ndarray]],
+    start_ms: Optional[float] = None,
+    end_ms: Optional[float] = None,
+    limit: Optional[int] = None,
+    max_delta_ms: int = 1000,
+    matched: Optional[Sequence[Dict[str, np.ndarray]]] = None,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Readings of several surveys within `[start_ms, end_ms)`, merged in time
+    order and cut to `limit` rows. `file` is the survey position; `row_id` is
+    the viewer id (`r<N>`) of georeferenced readings, None otherwise.
+    Also returns the number of readings in the window before the cut.
+    """
+    windows = [time_window(index, start_ms, end_ms) for index in indexes]
+    merged = merge_time_ordered([index["utc_ms"][rows] for index, rows in zip(indexes, windows)])
+    total = len(merged["source"])
+    source, position = merged["source"][:limit], merged["position"][:limit]
+    n = len(source)
+    columns = {
+        "file": source,
+        "line_name": np.empty(n, dtype=object),
+        "utc_ms": np.full(n, np.nan),
+        "time_ms": np.zeros(n, dtype=np.int64),
+        "conductivity": np.full(n, np.nan),
+        "inphase": np.full(n, np.nan),
+        "lat": np.full(n, np.nan),
+        "lon": np.full(n, np.nan),
+        "row_id": np.full(n, None, dtype=object),
+    }
+    for file_idx, survey in enumerate(surveys):
+        pick = np.flatnonzero(source == file_idx)
+        if not len(pick):
+            continue
+        r = survey.readings
+        g = survey.gps
+        reading_idx = windows[file_idx][position[pick]]
+        pairs = matched[file_idx] if matched is not None else match_survey(survey, max_delta_ms=max_delta_ms)
+        gps_of = np.full(len(r["time_ms"]), -1, dtype=np.int64)
+        gps_of[pairs["reading"]] = pairs["gps"]
+        row_of = np.zeros(len(r["time_ms"]), dtype=np.int64)
+        row_of[pairs["reading"]] = np.arange(1, len(pairs["reading"]) + 1)
+        names = np.asarray([name or "" for name in survey.line_names] or [""], dtype=object)
+        columns["line_name"][pick] = names[r["line"][reading_idx]]
+        columns["utc_ms"][pick] = indexes[file_idx]["utc_ms"][reading_idx]
+        columns["time_ms"][pick] = r["time_ms"][reading_idx]
+        columns["conductivity"][pick] = r["conductivity"][reading_idx]
+        columns["inphase"][pick] = r["inphase"][reading_idx]
+        gps_idx = gps_of[reading_idx]
+        located = gps_idx >= 0
+        columns["lat"][pick[located]] = g["lat"][gps_idx[located]]
+        columns["lon"][pick[located]] = g["lon"][gps_idx[located]]
+        rows = row_of[reading_idx]
+        numbered = rows > 0
+        columns["row_id"][pick[numbered]] = np.char.add("r", rows[numbered].astype(str)).astype(object)
+    return pd.DataFrame(columns), total
@@ -0,0 +1,58 @@
+"""
+Replay an existing .R31 file into a new one, as the field computer would while recording.
+Used to try the live tail mode (`/ws/tail`) without the instrument, e.g.:
+
+    python backend/replay_r31.py data-EM31/EM31/prud1.R31 /tmp/live.R31 --speed 10
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+TIMESTAMP_RE = re.compile(r"(\d{1,10})\s*$")
+
+
+def record_time_ms(line):
+    if not line or line[0] not in "T2!":
+        return None
+    match = TIMESTAMP_RE.search(line)
+    return int(match.group(1)) if match else None
+
+
+def replay(source, target, speed=1.0, split_records=False):
+    last_ms = None
+    with open(source, "r", errors="ignore", newline="") as src, open(target, "w", newline="") as dst:
+        for line in src:
+            time_ms = record_time_ms(line.rstrip("\r\n"))
+            if time_ms is not None:
+                if last_ms is not None and time_ms > last_ms:
+                    time.sleep(min((time_ms - last_ms) / 1000.0 / speed, 5.0))
+                last_ms = time_ms
+            if split_records and len(line) > 4:
+                # Flush half a record first to exercise partial-line handling.
+                half = len(line) // 2
+                dst.write(line[:half])
+                dst.flush()
+                time.sleep(0.01)
+                line = line[half:]
+            dst.write(line)
+            dst.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejoue un fichier .R31 ligne par ligne vers un fichier cible.")
+    parser.add_argument("source", type=Path)
+    parser.add_argument("target", type=Path)
+    parser.add_argument("--speed", type=float, default=1.0, help="facteur d'accélération (défaut: temps réel)")
+    parser.add_argument("--split-records", action="store_true", help="écrit chaque enregistrement en deux fois")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        print("--speed doit être > 0", file=sys.stderr)
+        raise SystemExit(1)
+    replay(args.source, args.target, speed=args.speed, split_records=args.split_records)
+    print(f"Rejeu terminé : {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+In-memory cache for the offline basemap tiles served under /tiles.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+TILE_SIZE = 256
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def blank_png(size: int = TILE_SIZE) -> bytes:
+    """
+    Fully transparent RGBA PNG, built without an imaging library.
+    """
+    header = struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0)
+    rows = b"".join(b"\x00" + b"\x00" * (size * 4) for _ in range(size))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(rows, 9))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def strong_etag(content: bytes) -> str:
+    return '"' + hashlib.sha1(content).hexdigest() + '"'
+
+
+@dataclass(frozen=True)
+class Tile:
+    content: bytes
+    etag: str
+
+
+def make_tile(content: bytes) -> Tile:
+    return Tile(content=content, etag=strong_etag(content))
+
+
+PLACEHOLDER_TILE = make_tile(blank_png())
+# Budget charged for remembering that a tile does not exist.
+MISSING_ENTRY_BYTES = 64
+# Missing tiles may be downloaded later: they are looked up again after this delay.
+MISSING_TTL_S = 3600
+
+
+class CacheStats:
+    """
+    Hit / miss counters per route, exposed by /api/cache-stats; `hit_ratio`
+    is `hit / (hit + miss)`, other events (e.g. `missing_hit`) are left out.
+    With a `root` shared by the workers, each process publishes its counters
+    there (at most every `flush_interval_s`) and `snapshot` sums them all.
+    `describe` adds per-worker details, such as the tile cache occupancy.
+    """
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        flush_interval_s: float = 1.0,
+        describe: Optional[Callable[[], Dict[str, object]]] = None,
+    ) -> None:
+        self.root = Path(root) if root else None
+        self.flush_interval_s = flush_interval_s
+        self.describe = describe
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._last_flush = 0.0
+        self._pending: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def record(self, route: str, event: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(route, {})
+            counts[event] = counts.get(event, 0) + 1
+            if self.root is None or self._pending is not None:
+                return
+            # Batch the writes: publish once the interval has elapsed, even if idle by then.
+            delay = max(self.flush_interval_s - (time.monotonic() - self._last_flush), 0.0)
+            self._pending = threading.Timer(delay, self.flush)
+            self._pending.daemon = True
+            self._pending.start()
+
+    def flush(self) -> None:
+        if self.root is None:
+            return
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if self._pending is not None:
+                self._pending.cancel()
+                self._pending = None
+            state = {
+                "pid": os.getpid(),
+                "counts": {route: dict(counts) for route, counts in self._counts.items()},
+                "details": self.describe() if self.describe else {},
+            }
+        self.root.mkdir(parents=True, exist_ok=True)
+        target = self.root / f"{os.getpid()}.json"
+        staging = self.root / f".{os.getpid()}.json.tmp"
+        staging.write_text(json.dumps(state))
+        os.replace(staging, target)
+
+    def _workers(self) -> List[Dict[str, object]]:
+        if self.root is None:
+            with self._lock:
+                counts = {route: dict(c) for route, c in self._counts.items()}
+            return [{"pid": os.getpid(), "counts": counts, "details": self.describe() if self.describe else {}}]
+        self.flush()
+        workers = []
+        for path in sorted(self.root.glob("*.json")):
+            try:
+                workers.append(json.loads(path.read_text()))
+            except (FileNotFoundError, ValueError):
+                continue
+        return workers
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Counters summed over every worker (other workers' counts may lag by
+        up to `flush_interval_s`), plus the per-worker details.
+        """
+        workers = self._workers()
+        totals: Dict[str, Dict[str, int]] = {}
+        for worker in workers:
+            for route, counts in worker["counts"].items():
+                route_totals = totals.setdefault(route, {})
+                for event, value in counts.items():
+                    route_totals[event] = route_totals.get(event, 0) + value
+        routes: Dict[str, Dict[str, float]] = {}
+        for route, counts in totals.items():
+            hits = counts.get("hit", 0)
+            lookups = hits + counts.get("miss", 0)
+            entry: Dict[str, float] = dict(counts)
+            entry["hit_ratio"] = hits / lookups if lookups else 0.0
+            routes[route] = entry
+        return {
+            "routes": routes,
+            "workers": [{"pid": worker["pid"], **worker["details"]} for worker in workers],
+        }
+
+
+class TileCache:
+    """
+    LRU of tile bytes keyed by (z, x, y), bounded by a total byte budget.
+    Missing tiles are remembered too, for `missing_ttl_s` seconds, so they do
+    not hit the disk on every request but are found once downloaded.
+    """
+
+    def __init__(
+        self, root: Path, max_bytes: int = 64 * 1024 * 1024, missing_ttl_s: float = MISSING_TTL_S
+    ) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.missing_ttl_s = missing_ttl_s
+        self.size_bytes = 0
+        self._tiles: "OrderedDict[Tuple[int, int, int], Optional[Tile]]" = OrderedDict()
+        self._missing_until: Dict[Tuple[int, int, int], float] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, z: int, x: int, y: int) -> Tuple[Optional[Tile], bool]:
+        """
+        Return `(tile, hit)`; `tile` is None when no such file exists.
+        """
+        key = (z, x, y)
+        with self._lock:
+            if key in self._tiles:
+                if key in self._missing_until and self._missing_until[key] <= time.monotonic():
+                    self._remove(key)
+                else:
+                    self._tiles.move_to_end(key)
+                    return self._tiles[key], True
+        tile = self._load(z, x, y)
+        with self._lock:
+            if key not in self._tiles:
+                self._tiles[key] = tile
+                self.size_bytes += self._cost(tile)
+                if tile is None:
+                    self._missing_until[key] = time.monotonic() + self.missing_ttl_s
+                self._evict()
+        return tile, False
+
+    def _load(self, z: int, x: int, y: int) -> Optional[Tile]:
+        path = self.root / str(z) / str(x) / f"{y}.png"
+        try:
+            content = path.read_bytes()
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return None
+        return make_tile(content)
+
+    @staticmethod
+    def _cost(tile: Optional[Tile]) -> int:
+        return len(tile.content) if tile else MISSING_ENTRY_BYTES
+
+    def _remove(self, key: Tuple[int, int, int]) -> None:
+        tile = self._tiles.pop(key)
+        self._missing_until.pop(key, None)
+        self.size_bytes -= self._cost(tile)
+
+    def _evict(self) -> None:
+        while self.size_bytes > self.max_bytes and self._tiles:
+            self._remove(next(iter(self._tiles)))
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._tiles), "bytes": self.size_bytes, "max_bytes": self.max_bytes}
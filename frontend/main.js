@@ -42,7 +42,13 @@ const drillLonInput = document.getElementById("drill-lon");
 const drillThicknessInput = document.getElementById("drill-thickness");
 const drillClearBtn = document.getElementById("drill-clear");
 const drillListEl = document.getElementById("drill-list");
+const drillCalibrateBtn = document.getElementById("drill-calibrate");
+const drillCalibrationEl = document.getElementById("drill-calibration");
 const measureToggleBtn = document.getElementById("measure-toggle");
+const tailForm = document.getElementById("tail-form");
+const tailPathInput = document.getElementById("tail-path");
+const tailToggleBtn = document.getElementById("tail-toggle");
+const tailStatusEl = document.getElementById("tail-status");
 
 let map;
 let dataLayer;
@@ -57,6 +63,8 @@ let customCoeffs = null;
 let nextRowId = 1;
 let pointsTable = null;
 let pointsTableReady = null;
+// Table loads (replaceData / addData) run one after the other.
+let tableLoad = null;
 let readingsById = new Map();
 let selectedRowId = null;
 let markerByRowId = new Map();
@@ -74,6 +82,22 @@ let measureLabel = null;
 let measureMarkers = [];
 let measureHandlersBound = false;
 let measureToggleBound = false;
+let currentSessionId = null;
+let excludedRowIds = [];
+// Table edits, row id -> { field: value }, replayed by the server export.
+// Thickness is sent as `base_thickness` (thickness + instrument height), like `_base_thickness`.
+let editedCells = {};
+let tailSocket = null;
+// A live tail has no upload: server sessions are snapshots requested over the socket.
+let tailSessionStale = false;
+let tailSessionRequest = null;
+let tailSessionResolve = null;
+// Incremental tail rendering: conductivity range seen so far and track features by line.
+let tailCondRange = null;
+let tailTrackByLine = new Map();
+// Color scale of the markers currently on the map, and their track layers by line.
+let markerScale = null;
+let trackLayerByLine = new Map();
 
 const DRILL_FORMATS = {
     decimal: {
@@ -109,10 +133,13 @@ const EM31_COEFF_PRESETS = {
 
 const DEFAULT_COEFF_PROFILE = "winter";
 
+const EXPORT_COLUMNS = ["time_ms", "lat", "lon", "conductivity", "thickness", "inphase"];
+
 form.addEventListener("submit", async (e) => {
     e.preventDefault();
     if (!fileInput.files.length) return;
     const file = fileInput.files[0];
+    if (tailSocket) stopTail();
     statusEl.textContent = "Envoi...";
     const fd = new FormData();
     fd.append("file", file);
@@ -145,7 +172,11 @@ form.addEventListener("submit", async (e) => {
         }
         const payload = await res.json();
         statusEl.textContent = "OK";
+        if (tailSocket) stopTail();
         lastGeojson = payload.geojson;
+        currentSessionId = payload.session_id || null;
+        excludedRowIds = [];
+        editedCells = {};
         prepareGeojson(lastGeojson, instHeight, coeffs);
         rebuildReadingIndex(lastGeojson);
         updateMeta(payload);
@@ -158,6 +189,179 @@ form.addEventListener("submit", async (e) => {
     }
 });
 
+tailForm?.addEventListener("submit", (e) => {
+    e.preventDefault();
+    if (tailSocket) {
+        stopTail();
+        return;
+    }
+    const path = tailPathInput?.value?.trim();
+    if (!path) return;
+    const instHeight = readInstHeightOrDefault();
+    const coeffSelection = readCoeffSelection();
+    if (!coeffSelection) {
+        tailStatusEl.textContent = "Erreur: coefficients invalides.";
+        return;
+    }
+    const { profile, coeffs } = coeffSelection;
+    const query = new URLSearchParams({
+        path,
+        inst_height: String(instHeight),
+        coeff_profile: profile,
+    });
+    if (profile === "custom") {
+        query.set("coeff_a", String(coeffs[0]));
+        query.set("coeff_b", String(coeffs[1]));
+        query.set("coeff_c", String(coeffs[2]));
+    }
+    currentInstHeight = instHeight;
+    currentCoeffs = coeffs;
+    currentSessionId = null;
+    tailSessionStale = false;
+    excludedRowIds = [];
+    editedCells = {};
+    nextRowId = 1;
+    const tailData = { type: "FeatureCollection", features: [], bounds: null };
+    lastGeojson = tailData;
+    tailCondRange = null;
+    tailTrackByLine = new Map();
+    selectedRowId = null;
+    // Start from an empty map, table and index: updates only append to them.
+    rebuildReadingIndex(tailData);
+    markerByRowId = new Map();
+    renderData(tailData);
+    fillTable(tailData);
+    const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
+    const socket = new WebSocket(`${protocol}//${window.location.host}/ws/tail?${query.toString()}`);
+    tailSocket = socket;
+    tailToggleBtn.textContent = "Arrêter";
+    tailStatusEl.textContent = "Connexion...";
+    let firstUpdate = true;
+    socket.addEventListener("open", () => {
+        tailStatusEl.textContent = "En attente de mesures...";
+    });
+    socket.addEventListener("message", (event) => {
+        const payload = JSON.parse(event.data);
+        // A closing socket may still answer after another file was loaded.
+        if (lastGeojson !== tailData) {
+            resolveTailSession();
+            return;
+        }
+        if (payload.type === "error") {
+            tailStatusEl.textContent = `Erreur: ${payload.detail}`;
+            return;
+        }
+        if (payload.type === "session") {
+            currentSessionId = payload.session_id || null;
+            tailSessionStale = false;
+            resolveTailSession();
+            return;
+        }
+        applyTailUpdate(payload, { fitBounds: firstUpdate });
+        firstUpdate = false;
+    });
+    socket.addEventListener("close", () => {
+        resolveTailSession();
+        if (tailSocket === socket) stopTail({ keepStatus: true });
+    });
+});
+
+function stopTail({ keepStatus = false } = {}) {
+    const socket = tailSocket;
+    tailSocket = null;
+    if (socket && tailSessionStale) {
+        // Keep a server session of the final state so export and calibration still work.
+        requestTailSession(socket).finally(() => socket.close());
+    } else {
+        socket?.close?.();
+    }
+    if (tailToggleBtn) tailToggleBtn.textContent = "Suivre";
+    if (!keepStatus && tailStatusEl) tailStatusEl.textContent = "Arrêté";
+}
+
+function requestTailSession(socket) {
+    if (!socket || socket.readyState !== WebSocket.OPEN) return Promise.resolve(currentSessionId);
+    if (!tailSessionRequest) {
+        tailSessionRequest = new Promise((resolve) => {
+            tailSessionResolve = resolve;
+        });
+        socket.send(JSON.stringify({ type: "session" }));
+    }
+    return tailSessionRequest;
+}
+
+function resolveTailSession() {
+    tailSessionResolve?.(currentSessionId);
+    tailSessionRequest = null;
+    tailSessionResolve = null;
+}
+
+// Server session holding the displayed data, refreshed from the tail when it moved on.
+async function ensureSession() {
+    if (tailSocket && (tailSessionStale || !currentSessionId)) {
+        return requestTailSession(tailSocket);
+    }
+    if (tailSessionRequest) return tailSessionRequest;
+    return currentSessionId;
+}
+
+function applyTailUpdate(payload, { fitBounds = false } = {}) {
+    if (!lastGeojson) return;
+    const features = payload.features || [];
+    if (features.length) tailSessionStale = true;
+    // Only the new features are prepared, drawn and added to the table.
+    prepareGeojson({ features }, currentInstHeight, currentCoeffs);
+    lastGeojson.features.push(...features);
+    features.forEach((f) => readingsById.set(f.properties._row_id, f));
+    const newTracks = [];
+    (payload.tracks || []).forEach((track) => {
+        const existing = tailTrackByLine.get(track.line_name);
+        if (existing) {
+            existing.geometry.coordinates.push(...track.coordinates);
+            const layer = trackLayerByLine.get(track.line_name);
+            track.coordinates.forEach(([lon, lat]) => layer?.addLatLng?.([lat, lon]));
+            return;
+        }
+        const feature = {
+            type: "Feature",
+            geometry: { type: "LineString", coordinates: [...track.coordinates] },
+            properties: { kind: "track", line_name: track.line_name },
+        };
+        tailTrackByLine.set(track.line_name, feature);
+        lastGeojson.features.push(feature);
+        newTracks.push(feature);
+    });
+    features.forEach((f) => {
+        const value = f.properties.conductivity;
+        if (typeof value !== "number") return;
+        if (!tailCondRange) tailCondRange = { min: value, max: value };
+        tailCondRange.min = Math.min(tailCondRange.min, value);
+        tailCondRange.max = Math.max(tailCondRange.max, value);
+    });
+    if (tailCondRange) {
+        autoScale = paddedScale(tailCondRange.min, tailCondRange.max);
+        if (!manualScale) setScaleInputs(autoScale);
+    }
+    if (window.L && dataLayer) {
+        const scale = getScale();
+        if (!markerScale || scale.min !== markerScale.min || scale.max !== markerScale.max) {
+            // The range grew: recolor the existing markers once.
+            markerScale = scale;
+            markerByRowId.forEach((_, rowId) => updateLeafletMarker(rowId));
+            updateLegend(scale);
+        }
+        dataLayer.addData({ type: "FeatureCollection", features: [...newTracks, ...features] });
+        if (fitBounds) fitToBounds(map, { bounds: payload.bounds });
+    } else {
+        rerenderWithScaleOptions({ fitBounds });
+    }
+    addTableRows(features);
+    updateMeta(payload);
+    updateFileInfo(payload);
+    const total = readingsById.size;
+    tailStatusEl.textContent = `En direct · ${total} mesures`;
+}
+
 function readInstHeightOrDefault() {
     if (!instHeightInput) return 0.15;
     const v = parseFloat(instHeightInput.value);
@@ -352,36 +556,23 @@ function renderLeaflet(featureCollection, scale, { fitBounds } = {}) {
         dataLayer.remove();
     }
     const condStats = scale;
+    markerScale = scale;
     markerByRowId = new Map();
+    trackLayerByLine = new Map();
+    // Later `addData` calls (live tail) reuse these options.
     const geoJson = L.geoJSON(featureCollection, {
-        pointToLayer: (feature, latlng) => {
-            if (feature.properties.kind !== "reading") return null;
-            const color = conductivityColor(
-                feature.properties.conductivity,
-                condStats
-            );
-            const marker = L.circleMarker(latlng, {
-                radius: 5,
-                color,
-                fillColor: color,
-                fillOpacity: 0.8,
-                weight: 1,
-            });
-            marker.bindPopup(readingPopupHtml(feature.properties));
-            if (feature.properties._row_id) {
-                markerByRowId.set(feature.properties._row_id, marker);
-            }
-            marker.on("click", () => {
-                selectRowInTable(feature.properties._row_id);
-            });
-            return marker;
-        },
+        pointToLayer: readingMarker,
         style: (feature) => {
             if (feature.properties.kind === "track") {
                 return { color: "#2c7be5", weight: 2 };
             }
             return {};
         },
+        onEachFeature: (feature, layer) => {
+            if (feature.properties.kind === "track") {
+                trackLayerByLine.set(feature.properties.line_name, layer);
+            }
+        },
         filter: (feature) => feature.geometry && feature.properties,
     });
     geoJson.addTo(map);
@@ -579,6 +770,26 @@ function updateLeafletMarker(rowId) {
     popup?.setContent(readingPopupHtml(feature.properties));
 }
 
+function readingMarker(feature, latlng) {
+    if (feature.properties.kind !== "reading") return null;
+    const color = conductivityColor(feature.properties.conductivity, markerScale);
+    const marker = L.circleMarker(latlng, {
+        radius: 5,
+        color,
+        fillColor: color,
+        fillOpacity: 0.8,
+        weight: 1,
+    });
+    marker.bindPopup(readingPopupHtml(feature.properties));
+    if (feature.properties._row_id) {
+        markerByRowId.set(feature.properties._row_id, marker);
+    }
+    marker.on("click", () => {
+        selectRowInTable(feature.properties._row_id);
+    });
+    return marker;
+}
+
 function openPopupForRow(rowId) {
     if (!window.L || !rowId) return;
     const marker = markerByRowId.get(rowId);
@@ -663,8 +874,10 @@ function conductivityStats(fc) {
         .map((f) => f.properties.conductivity)
         .filter((v) => typeof v === "number");
     if (!values.length) return { min: 0, max: 0 };
-    const min = Math.min(...values);
-    const max = Math.max(...values);
+    return paddedScale(Math.min(...values), Math.max(...values));
+}
+
+function paddedScale(min, max) {
     const range = Math.max(max - min, 1e-6);
     const pad = range * 0.05;
     return { min: min - pad, max: max + pad };
@@ -772,12 +985,25 @@ function deleteReadingById(rowId) {
     if (!lastGeojson || !Array.isArray(lastGeojson.features) || !rowId) return false;
     lastGeojson.features = lastGeojson.features.filter((f) => !(f?.properties?.kind === "reading" && f.properties._row_id === rowId));
     readingsById.delete(rowId);
+    excludedRowIds.push(rowId);
+    delete editedCells[rowId];
     markerByRowId.get(rowId)?.remove?.();
     markerByRowId.delete(rowId);
     if (selectedRowId === rowId) selectedRowId = null;
     return true;
 }
 
+function recordEdit(rowId, field, value) {
+    editedCells[rowId] = { ...editedCells[rowId], [field]: value };
+}
+
+function dropThicknessEdit(rowId) {
+    const edit = editedCells[rowId];
+    if (!edit || !("base_thickness" in edit)) return;
+    delete edit.base_thickness;
+    if (!Object.keys(edit).length) delete editedCells[rowId];
+}
+
 function handleTableCellEdited(cell) {
     if (tableSyncLock) return;
     if (!cell) return;
@@ -797,6 +1023,7 @@ function handleTableCellEdited(cell) {
             "conductivity",
             "thickness",
             "inphase",
+            "range",
             "gps_satellites",
             "gps_hdop",
         ]);
@@ -814,10 +1041,25 @@ function handleTableCellEdited(cell) {
         if (field === "thickness") {
             feature.properties.thickness = value;
             feature.properties._base_thickness = typeof value === "number" ? value + currentInstHeight : null;
+            recordEdit(rowId, "base_thickness", feature.properties._base_thickness);
+        } else if (field === "conductivity") {
+            feature.properties.conductivity = value;
+            recordEdit(rowId, "conductivity", value);
+            // Same rule as `recomputeBaseThickness`: a valid conductivity drives the thickness.
+            const base = computeBaseThickness(value, currentCoeffs);
+            if (typeof base === "number" && Number.isFinite(base)) {
+                feature.properties._base_thickness = base;
+                feature.properties.thickness = base - currentInstHeight;
+                dropThicknessEdit(rowId);
+                row?.update?.({ thickness: feature.properties.thickness });
+            } else {
+                recordEdit(rowId, "base_thickness", feature.properties._base_thickness ?? null);
+            }
         } else if (field === "lat" || field === "lon") {
             // Not editable in UI, but keep this guard for safety.
         } else {
             feature.properties[field] = value;
+            recordEdit(rowId, field, value);
         }
     } finally {
         tableSyncLock = false;
@@ -894,100 +1136,116 @@ function selectRowInTable(rowId, { scrollTo = true } = {}) {
         .catch((err) => console.error(err));
 }
 
+function tableRow(feature) {
+    const p = feature.properties;
+    const [lon, lat] = feature.geometry.coordinates;
+    return {
+        id: p._row_id,
+        time_ms: p.time_ms ?? null,
+        lat,
+        lon,
+        conductivity: p.conductivity ?? null,
+        thickness: p.thickness ?? null,
+        inphase: p.inphase ?? null,
+        range: p.range ?? null,
+        dipole_mode: p.dipole_mode ?? null,
+        gps_satellites: p.gps_satellites ?? null,
+        gps_hdop: p.gps_hdop ?? null,
+    };
+}
+
+function addTableRows(features) {
+    ensurePointsTable();
+    if (!pointsTable || !features.length) return;
+    if (!pointsTableReady) pointsTableReady = Promise.resolve();
+    const rows = features.map(tableRow);
+    // Queued behind any pending replaceData so rows are neither lost nor duplicated.
+    tableLoad = (tableLoad || pointsTableReady).then(() => pointsTable.addData(rows)).catch((err) => console.error(err));
+}
+
 function fillTable(featureCollection) {
     ensurePointsTable();
     if (!pointsTable || !featureCollection || !Array.isArray(featureCollection.features)) return;
     if (!pointsTableReady) pointsTableReady = Promise.resolve();
-    const rows = featureCollection.features
-        .filter((f) => f.properties && f.properties.kind === "reading")
-        .map((f) => {
-            const p = f.properties;
-            const [lon, lat] = f.geometry.coordinates;
-            return {
-                id: p._row_id,
-                time_ms: p.time_ms ?? null,
-                lat,
-                lon,
-                conductivity: p.conductivity ?? null,
-                thickness: p.thickness ?? null,
-                inphase: p.inphase ?? null,
-                range: p.range ?? null,
-                dipole_mode: p.dipole_mode ?? null,
-                gps_satellites: p.gps_satellites ?? null,
-                gps_hdop: p.gps_hdop ?? null,
-            };
-        });
-    pointsTableReady
-        .then(() => {
-            const tryReplaceData = (attempt = 0) => {
-                const maxAttempts = 120;
-                try {
-                    const restoreSelection = () => {
-                        if (selectedRowId) {
-                            selectRowInTable(selectedRowId, { scrollTo: false });
-                        }
-                    };
-                    const result = pointsTable.replaceData(rows);
-                    if (result && typeof result.then === "function") {
-                        result.then(restoreSelection).catch((err) => {
+    const rows = featureCollection.features.filter((f) => f.properties && f.properties.kind === "reading").map(tableRow);
+    tableLoad = (tableLoad || pointsTableReady)
+        .then(
+            () =>
+                new Promise((resolve) => {
+                    const tryReplaceData = (attempt = 0) => {
+                        const maxAttempts = 120;
+                        const giveUp = (err) => {
+                            console.error(err);
+                            resolve();
+                        };
+                        try {
+                            const restoreSelection = () => {
+                                if (selectedRowId) {
+                                    selectRowInTable(selectedRowId, { scrollTo: false });
+                                }
+                                resolve();
+                            };
+                            const result = pointsTable.replaceData(rows);
+                            if (result && typeof result.then === "function") {
+                                result.then(restoreSelection).catch((err) => {
+                                    if (attempt >= maxAttempts) {
+                                        giveUp(err);
+                                        return;
+                                    }
+                                    setTimeout(() => tryReplaceData(attempt + 1), 50);
+                                });
+                                return;
+                            }
+                            restoreSelection();
+                        } catch (err) {
                             if (attempt >= maxAttempts) {
-                                console.error(err);
+                                giveUp(err);
                                 return;
                             }
                             setTimeout(() => tryReplaceData(attempt + 1), 50);
-                        });
-                        return;
-                    }
-                    restoreSelection();
-                } catch (err) {
-                    if (attempt >= maxAttempts) {
-                        console.error(err);
-                        return;
-                    }
-                    setTimeout(() => tryReplaceData(attempt + 1), 50);
-                }
-            };
-
-            tryReplaceData();
-        })
+                        }
+                    };
+
+                    tryReplaceData();
+                })
+        )
         .catch((err) => console.error(err));
 }
 
-exportBtn.addEventListener("click", () => {
-    if (!lastGeojson || !Array.isArray(lastGeojson.features)) return;
-    const readings = lastGeojson.features.filter((f) => f.properties && f.properties.kind === "reading");
-    const header = [
-        "time_ms",
-        "lat",
-        "lon",
-        "conductivity",
-        "thickness",
-        "inphase",
-    ];
-    const lines = [header.join(",")];
-    readings.forEach((f) => {
-        const p = f.properties;
-        const [lon, lat] = f.geometry.coordinates;
-        lines.push(
-            [
-                p.time_ms,
-                lat,
-                lon,
-                p.conductivity,
-                p.thickness,
-                p.inphase,
-            ]
-                .map((v) => (v === null || v === undefined ? "" : v))
-                .join(",")
-        );
+exportBtn.addEventListener("click", async () => {
+    const sessionId = await ensureSession();
+    if (!sessionId) {
+        statusEl.textContent = "Export impossible : aucune donnée côté serveur, charge ou suis un fichier .R31.";
+        return;
+    }
+    // Send the coefficients currently applied in the viewer so the export matches the table.
+    const coeffs = currentCoeffs || getPresetCoeffs(DEFAULT_COEFF_PROFILE);
+    const fields = {
+        format: "csv",
+        columns: EXPORT_COLUMNS.join(","),
+        exclude: excludedRowIds.join(","),
+        edits: JSON.stringify(editedCells),
+        inst_height: String(currentInstHeight),
+        coeff_profile: "custom",
+        coeff_a: String(coeffs[0]),
+        coeff_b: String(coeffs[1]),
+        coeff_c: String(coeffs[2]),
+    };
+    // A plain form post lets the browser stream the download to disk as it arrives.
+    const exportForm = document.createElement("form");
+    exportForm.method = "POST";
+    exportForm.action = `/api/sessions/${encodeURIComponent(sessionId)}/export`;
+    exportForm.style.display = "none";
+    Object.entries(fields).forEach(([name, value]) => {
+        const input = document.createElement("input");
+        input.type = "hidden";
+        input.name = name;
+        input.value = value;
+        exportForm.appendChild(input);
     });
-    const blob = new Blob([lines.join("\n")], { type: "text/csv" });
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement("a");
-    a.href = url;
-    a.download = "em31_points.csv";
-    a.click();
-    URL.revokeObjectURL(url);
+    document.body.appendChild(exportForm);
+    exportForm.submit();
+    exportForm.remove();
 });
 
 function setTabulatorColumnVisible(field, visible) {
@@ -1166,6 +1424,8 @@ function recomputeBaseThickness(featureCollection, instHeight, coeffs) {
         if (typeof base === "number" && Number.isFinite(base)) {
             feature.properties._base_thickness = base;
             feature.properties.thickness = base - instHeight;
+            // The recomputed value replaces a hand-edited thickness, in the export too.
+            dropThicknessEdit(feature.properties._row_id);
             return;
         }
         const existingBase = feature.properties._base_thickness;
@@ -1588,6 +1848,71 @@ drillClearBtn?.addEventListener("click", () => {
     clearDrillingPoints();
 });
 
+function applyCalibratedCoeffs(coeffs) {
+    customCoeffs = [...coeffs];
+    if (coeffProfileSelect) coeffProfileSelect.value = "custom";
+    syncCoeffProfileUI();
+    lastCoeffProfile = getCoeffProfile();
+    applyConfig({ instHeight: currentInstHeight, coeffs });
+}
+
+drillCalibrateBtn?.addEventListener("click", async () => {
+    const sessionId = await ensureSession();
+    if (!sessionId) {
+        drillCalibrationEl.textContent = "Charge ou suis d'abord un fichier .R31.";
+        return;
+    }
+    if (drillingPoints.length < 3) {
+        drillCalibrationEl.textContent = "Il faut au moins 3 points de forage.";
+        return;
+    }
+    drillCalibrationEl.textContent = "Calibration...";
+    try {
+        const res = await fetch(`/api/sessions/${encodeURIComponent(sessionId)}/calibrate`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({
+                inst_height: currentInstHeight,
+                drill_points: drillingPoints.map((p) => ({
+                    id: p.id,
+                    lat: p.lat,
+                    lon: p.lon,
+                    thickness: p.thickness,
+                })),
+            }),
+        });
+        const payload = await res.json();
+        if (!res.ok) {
+            throw new Error(payload.detail || `Calibration échouée (${res.status})`);
+        }
+        const coeffs = payload.coeffs;
+        const used = (payload.holes || []).filter((h) => h.residual !== null).length;
+        const summary =
+            `a=${fmtNum(coeffs[0], 4)} · b=${fmtNum(coeffs[1], 2)} · c=${fmtNum(coeffs[2], 1)} · ` +
+            `RMSE ${fmtNum(payload.rmse, 3)} m (${used} forages)`;
+        const warnings = payload.warnings || [];
+        if (!warnings.length) {
+            applyCalibratedCoeffs(coeffs);
+            drillCalibrationEl.textContent = summary;
+            return;
+        }
+        // A doubtful fit is only applied on request.
+        drillCalibrationEl.textContent = `${summary} — non appliqué : ${warnings.join(" ")} `;
+        const applyBtn = document.createElement("button");
+        applyBtn.type = "button";
+        applyBtn.className = "btn-secondary";
+        applyBtn.textContent = "Appliquer quand même";
+        applyBtn.addEventListener("click", () => {
+            applyCalibratedCoeffs(coeffs);
+            drillCalibrationEl.textContent = summary;
+        });
+        drillCalibrationEl.appendChild(applyBtn);
+    } catch (err) {
+        console.error(err);
+        drillCalibrationEl.textContent = `Erreur: ${err.message}`;
+    }
+});
+
 drillForm?.addEventListener("submit", (e) => {
     e.preventDefault();
     const mode = getDrillFormat();
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import numpy as np
+
+from backend.em31.columns import survey_from_parsed
+from backend.em31.parser import parse_em31_file
+from backend.em31.timeindex import build_time_index, iso_utc, synced_fixes
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data-EM31" / "EM31"
+
+
+def time_index(name):
+    return build_time_index(survey_from_parsed(parse_em31_file(DATA_DIR / name)))
+
+
+def test_unsynced_receiver_clock_is_ignored():
+    # 073116B starts with fixes stamped 00:01 by a receiver that has not
+    # synced yet; its valid fixes must land on the same day as A and C.
+    index = time_index("073116B.R31")
+    assert index["utc_offset_ms"][0] == -495 * 60_000
+    for name in ("073116A.R31", "073116C.R31"):
+        assert time_index(name)["utc_offset_ms"][0] == index["utc_offset_ms"][0]
+    assert iso_utc(index["sorted_utc_ms"][0]).startswith("2018-07-31T08:0")
+    assert iso_utc(index["sorted_utc_ms"][-1]).startswith("2018-07-31T08:0")
+
+
+def test_synced_fixes_keeps_last_clock_segment():
+    hour = 3_600_000.0
+    diff = np.concatenate((np.full(5, 8 * hour), np.full(3, -8.25 * hour + 1000.0)))
+    assert synced_fixes(diff).tolist() == [False] * 5 + [True] * 3